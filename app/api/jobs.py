@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the pending queue is at capacity"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when it has been asked to stop"""
+
+
+class Job:
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.status = "queued"  # queued -> running -> done | failed | cancelled
+        self.completed = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def progress(self, completed, total):
+        """Progress callback handed to the job function; also the cancellation point"""
+        self.completed = completed
+        self.total = total
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": {"completed": self.completed, "total": self.total},
+            "params": self.params,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs long backtests in background threads.
+
+    At most `max_running` jobs execute at once and at most `max_queued`
+    wait behind them; further submissions raise JobQueueFull. Finished jobs
+    are kept for polling until `max_finished` newer ones replace them.
+    """
+
+    def __init__(self, max_running=2, max_queued=16, max_finished=100):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="autotest-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, params):
+        """Queue `fn(**params, progress=job.progress)` and return the new Job"""
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+            if active >= self.max_running + self.max_queued:
+                raise JobQueueFull(f"Too many pending jobs ({active}); try again later.")
+
+            job = Job(uuid.uuid4().hex, params)
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(**job.params, progress=job.progress)
+            job.status = "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued job immediately, or ask a running one to stop at its next progress report"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.status == "queued" and job.future.cancel():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status in ("done", "failed", "cancelled")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
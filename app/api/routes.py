@@ -1,14 +1,30 @@
+import os
+import json
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pandas.core.algorithms import rank
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, confloat, conint
 from datetime import date
+from typing import Optional, List
 
 from app.llm.generate import generate_response
 from app.data.ingest import ingest_stock, ingest_crypto
 from app.backtest.engine import autotest
+from app.backtest.walkforward import walkforward_test
+from app.backtest.portfolio import portfolio_test
+from app.backtest.dsl import custom_backtest
+from app.backtest.batch import batch_autotest, iter_batch_autotest, rank_symbols
+from app.backtest.incremental import track_strategy, leaderboard
+from app.api.jobs import JobManager, JobQueueFull
 
 router = APIRouter()
 
+# Background grid searches: bounded queue + concurrency limit
+autotest_jobs = JobManager(
+    max_running=int(os.getenv("AUTOTEST_MAX_RUNNING", "2")),
+    max_queued=int(os.getenv("AUTOTEST_MAX_QUEUED", "16")),
+)
+
 class LLMRequest(BaseModel):
     user_input: str
 
@@ -20,6 +36,13 @@ class IngestCryptoData(BaseModel):
     symbol: str
     interval: str
 
+class HalvingOptions(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    eta: conint(ge=2) = 3
+    min_fraction: confloat(gt=0, le=1) = 1 / 27
+    min_bars: conint(ge=1) = 300
+
 class AutoTestRequest(BaseModel):
     initial_capital: int
     ranking_metric: str
@@ -28,6 +51,76 @@ class AutoTestRequest(BaseModel):
     interval: str
     start_date: date
     end_date: date
+    search_mode: str = "exhaustive"  # exhaustive | halving | random | tpe
+    halving: Optional[HalvingOptions] = None  # successive-halving overrides for search_mode="halving"
+    optimizer_budget: int = 200
+    optimizer_time_limit: Optional[float] = None
+    use_cache: bool = True
+    keep_top: Optional[int] = None  # per-strategy combos kept in all_results (None = all)
+    response_format: str = "full"  # full | compact
+    max_points: Optional[int] = None  # equity curve points after LTTB downsampling
+    include_all_results: bool = True
+    include_trades: bool = True
+    exits: Optional[dict] = None  # e.g. {"stop_loss": [null, 0.05], "take_profit": [null, 0.1]}
+    robustness_paths: int = 0  # Monte Carlo paths per top strategy (0 = off)
+    robustness_method: str = "block"  # block | shuffle
+
+class BatchAutoTestRequest(BaseModel):
+    initial_capital: int
+    ranking_metric: str
+    asset_type: str
+    symbols: List[str]
+    intervals: List[str]
+    start_date: date
+    end_date: date
+    use_cache: bool = True
+
+class CustomStrategyRequest(BaseModel):
+    strategy: dict  # Strategy Testing JSON: {"strategy_name": ..., "parameters": {"entry_signal": ..., ...}}
+    initial_capital: int
+    asset_type: str
+    symbol: str
+    interval: str
+    start_date: date
+    end_date: date
+
+class PortfolioRequest(BaseModel):
+    initial_capital: int
+    asset_type: str
+    symbols: List[str]
+    interval: str
+    start_date: date
+    end_date: date
+    strategy: Optional[str] = None  # engine strategy applied per symbol (None = buy and hold)
+    params: Optional[dict] = None
+    weighting: str = "equal"  # equal | inverse_vol
+    rebalance: Optional[str] = "monthly"  # none | daily | weekly | monthly | quarterly
+    transaction_cost: float = 0.001
+
+class TrackStrategyRequest(BaseModel):
+    asset_type: str
+    symbol: str
+    interval: str
+    strategy: str
+    params: dict
+    initial_capital: int = 10000
+
+class LeaderboardRequest(BaseModel):
+    symbol: Optional[str] = None
+    interval: Optional[str] = None
+    ranking_metric: str = "sharpe"
+
+class WalkForwardRequest(BaseModel):
+    initial_capital: int
+    ranking_metric: str
+    asset_type: str
+    symbol: str
+    interval: str
+    start_date: date
+    end_date: date
+    train_bars: Optional[conint(ge=1)] = None
+    test_bars: Optional[conint(ge=1)] = None
+    anchored: bool = False
 
 @router.get("/")
 def welcome():
@@ -54,17 +147,16 @@ def llm_generate(llm_input: LLMRequest):
 def ingest_stock_route(ingest_details: IngestStockData):
     symbol = ingest_details.symbol
     interval = ingest_details.interval
-    # outputsize = ingest_details.outputsize
-    outputsize = "compact"
-    ingest_stock(symbol, interval, outputsize)
-    return {"status": "Stock data ingested successfully"}
+    # outputsize is planned from the stored coverage (compact, full, or no download at all)
+    report = ingest_stock(symbol, interval)
+    return {"status": "Stock data ingested successfully", "report": report}
 
 @router.get("/ingest-crypto")
 def ingest_crypto_route(ingest_details: IngestCryptoData):
     symbol = ingest_details.symbol
     interval = ingest_details.interval
-    ingest_crypto(symbol, interval)
-    return {"status": "Crypto data ingested successfully"}
+    report = ingest_crypto(symbol, interval)
+    return {"status": "Crypto data ingested successfully", "report": report}
 
 # Backtesting
 @router.get('/autotest')
@@ -76,6 +168,100 @@ def auto_backtest(autotest_request:AutoTestRequest):
     interval = autotest_request.interval
     start_date = autotest_request.start_date
     end_date = autotest_request.end_date
-    response = autotest(initial_capital, ranking_metric, asset_type, symbol, interval, start_date, end_date)
+    search_mode = autotest_request.search_mode
+    response = autotest(initial_capital, ranking_metric, asset_type, symbol, interval, start_date, end_date,
+                        search_mode=search_mode,
+                        halving=autotest_request.halving.model_dump() if autotest_request.halving else None,
+                        optimizer_budget=autotest_request.optimizer_budget,
+                        optimizer_time_limit=autotest_request.optimizer_time_limit,
+                        use_cache=autotest_request.use_cache,
+                        keep_top=autotest_request.keep_top,
+                        response_format=autotest_request.response_format,
+                        max_points=autotest_request.max_points,
+                        include_all_results=autotest_request.include_all_results,
+                        include_trades=autotest_request.include_trades,
+                        exits=autotest_request.exits,
+                        robustness_paths=autotest_request.robustness_paths,
+                        robustness_method=autotest_request.robustness_method)
+    return response
+
+
+@router.get('/walkforward')
+def walk_forward_backtest(walkforward_request: WalkForwardRequest):
+    response = walkforward_test(**walkforward_request.model_dump(), workers=int(os.getenv("WALKFORWARD_WORKERS", "4")))
+    return response
+
+
+# Asynchronous backtesting jobs
+@router.post('/autotest/jobs')
+def submit_autotest_job(autotest_request: AutoTestRequest):
+    try:
+        job = autotest_jobs.submit(autotest, autotest_request.model_dump())
+    except JobQueueFull as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", "job_id": job.id, "job_status": job.status}
+
+@router.post('/strategy/backtest')
+def custom_strategy_backtest(strategy_request: CustomStrategyRequest):
+    response = custom_backtest(**strategy_request.model_dump())
+    return response
+
+@router.get('/portfolio')
+def portfolio_backtest(portfolio_request: PortfolioRequest):
+    response = portfolio_test(**portfolio_request.model_dump())
+    return response
+
+@router.post('/strategies/track')
+def track_strategy_stats(track_request: TrackStrategyRequest):
+    req = track_request.model_dump()
+    response = track_strategy(req["asset_type"], req["symbol"], req["interval"], req["strategy"],
+                              req["params"], req["initial_capital"])
     return response
 
+@router.get('/strategies/leaderboard')
+def strategy_leaderboard(leaderboard_request: LeaderboardRequest):
+    response = leaderboard(**leaderboard_request.model_dump())
+    return {"status": "success", "leaderboard": response}
+
+@router.post('/autotest/batch')
+def batch_autotest_stream(batch_request: BatchAutoTestRequest):
+    """Newline-delimited JSON: one line per symbol/interval as it finishes, then the ranked table"""
+    def lines():
+        results = []
+        for result in iter_batch_autotest(**batch_request.model_dump()):
+            results.append(result)
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"status": "success", "ranking": rank_symbols(results, batch_request.ranking_metric)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post('/autotest/batch/jobs')
+def submit_batch_autotest_job(batch_request: BatchAutoTestRequest):
+    try:
+        job = autotest_jobs.submit(batch_autotest, batch_request.model_dump())
+    except JobQueueFull as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", "job_id": job.id, "job_status": job.status}
+
+@router.get('/autotest/jobs/{job_id}')
+def autotest_job_status(job_id: str):
+    job = autotest_jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job {job_id}"}
+    return {"status": "success", "job": job.to_dict()}
+
+@router.get('/autotest/jobs/{job_id}/result')
+def autotest_job_result(job_id: str):
+    job = autotest_jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job {job_id}"}
+    if job.status != "done":
+        return {"status": "error", "message": f"Job is {job.status}", "job": job.to_dict()}
+    return job.result
+
+@router.delete('/autotest/jobs/{job_id}')
+def cancel_autotest_job(job_id: str):
+    job = autotest_jobs.cancel(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job {job_id}"}
+    return {"status": "success", "job": job.to_dict()}
@@ -0,0 +1,134 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.backtest.engine import grid_search, _summary_stats, ENGINE_VERSION
+from app.backtest.indicator_cache import data_fingerprint
+from app.backtest.parallel import default_workers
+from app.backtest.result_store import get_result_store
+from app.data.candles import read_sql, epoch_bounds, from_epoch
+
+
+# --- Data Loading ---
+
+def fetch_data_bulk(asset_type, symbols, intervals, start_date, end_date, db_path=None):
+    """
+    Load candles for every (symbol, interval) pair in one query.
+    Returns {(symbol, interval): df} for the pairs that have data in [start_date, end_date].
+    """
+    df = read_sql(
+        f"""
+        SELECT symbol, interval, timestamp, open, high, low, close, volume FROM candles
+        WHERE symbol IN ({",".join("?" * len(symbols))})
+        AND interval IN ({",".join("?" * len(intervals))})
+        AND timestamp >= ? AND timestamp < ? AND type = ?
+        ORDER BY symbol, interval, timestamp
+        """,
+        [*symbols, *intervals, *epoch_bounds(start_date, end_date), asset_type],
+        db_path=db_path,
+    )
+    df['timestamp'] = from_epoch(df['timestamp'])
+
+    frames = {}
+    for (symbol, interval), group in df.groupby(['symbol', 'interval'], sort=False):
+        frames[(symbol, interval)] = group.set_index('timestamp')[['open', 'high', 'low', 'close', 'volume']]
+    return frames
+
+
+# --- Batch Autotest ---
+
+def _screen_symbol(symbol, interval, df, initial_capital, ranking_metric, use_cache=True):
+    """Worker entry point: grid-search one symbol and return its ranked strategies (metrics only)"""
+    result_store = None
+    if use_cache:
+        result_store = get_result_store().bind(
+            data_fingerprint(df, ('open', 'high', 'low', 'close', 'volume')), initial_capital, 0.001,
+            ENGINE_VERSION, symbol, interval, df.index[0], df.index[-1],
+        )
+
+    best_results, _ = grid_search(df, initial_capital, ranking_metric, result_store=result_store,
+                                  progress=lambda completed, total: None)
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "data_points": len(df),
+        "from": str(df.index[0]),
+        "to": str(df.index[-1]),
+        "strategies": [
+            {"strategy": strat, "parameters": params, "stats": _summary_stats(stats, initial_capital)}
+            for strat, params, stats in best_results
+        ],
+    }
+
+
+def iter_batch_autotest(initial_capital, ranking_metric, asset_type, symbols, intervals, start_date, end_date,
+                        workers=None, use_cache=True):
+    """
+    Grid-search every (symbol, interval) pair, yielding one result dict per
+    pair as soon as it finishes. Candles are loaded with a single query and
+    the pairs run on `workers` processes (BACKTEST_WORKERS by default).
+    Pairs without data are yielded first with status "error".
+    """
+    frames = fetch_data_bulk(asset_type, symbols, intervals, start_date, end_date)
+    for symbol in symbols:
+        for interval in intervals:
+            if (symbol, interval) not in frames:
+                yield {"status": "error", "symbol": symbol, "interval": interval,
+                       "message": "No data in the selected date range."}
+
+    if workers is None:
+        workers = default_workers()
+
+    if workers <= 1:
+        for (symbol, interval), df in frames.items():
+            yield {"status": "success",
+                   **_screen_symbol(symbol, interval, df, initial_capital, ranking_metric, use_cache)}
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            pool.submit(_screen_symbol, symbol, interval, df, initial_capital, ranking_metric, use_cache):
+                (symbol, interval)
+            for (symbol, interval), df in frames.items()
+        }
+        for future in as_completed(futures):
+            symbol, interval = futures[future]
+            try:
+                yield {"status": "success", **future.result()}
+            except Exception as e:
+                yield {"status": "error", "symbol": symbol, "interval": interval, "message": str(e)}
+    finally:
+        # Also reached when the consumer stops early (e.g. a streaming client disconnects)
+        pool.shutdown(cancel_futures=True)
+
+
+def rank_symbols(results, ranking_metric):
+    """Cross-symbol table of each pair's best strategy, best first"""
+    # Map engine metric names to the rounded API stat names
+    stat_name = {'sharpe': 'sharpe_ratio', 'sortino': 'sortino_ratio', 'calmar': 'calmar_ratio'}.get(
+        ranking_metric, ranking_metric)
+    rows = [
+        {"symbol": result["symbol"], "interval": result["interval"], **result["strategies"][0]}
+        for result in results if result["status"] == "success" and result["strategies"]
+    ]
+    rows.sort(key=lambda row: row["stats"][stat_name], reverse=True)
+    return rows
+
+
+def batch_autotest(initial_capital, ranking_metric, asset_type, symbols, intervals, start_date, end_date,
+                   workers=None, use_cache=True, progress=None):
+    """Run iter_batch_autotest() to completion and return the ranked table plus per-symbol results"""
+    total = len(symbols) * len(intervals)
+    results = []
+    for result in iter_batch_autotest(initial_capital, ranking_metric, asset_type, symbols, intervals,
+                                      start_date, end_date, workers, use_cache):
+        results.append(result)
+        if progress is not None:
+            progress(len(results), total)
+
+    return {
+        "status": "success",
+        "data": {
+            "ranking": rank_symbols(results, ranking_metric),
+            "symbols": results,
+        }
+    }
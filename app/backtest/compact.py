@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of the n_out - 2 buckets
+    in between, the point forming the largest triangle with the previously
+    kept point and the next bucket's average. Returns the kept indices.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def _epoch_seconds(timestamps):
+    return (pd.DatetimeIndex(pd.to_datetime(timestamps)).asi8 // 10**9).tolist()
+
+
+def compact_curve(equity_curve, max_points=None, index=None):
+    """
+    [[date, value], ...] -> {"t": [epoch seconds], "v": [values]}, downsampled
+    with LTTB to at most `max_points`. Pass the backtested frame's `index`
+    to skip re-parsing the date strings.
+    """
+    values = np.array([value for _, value in equity_curve], dtype=float)
+    if index is not None and len(index) == len(values):
+        t = pd.DatetimeIndex(index).asi8 // 10**9
+    else:
+        t = np.array(_epoch_seconds([date for date, _ in equity_curve]), dtype=np.int64)
+
+    if max_points:
+        kept = lttb(t, values, max_points)
+        t, values = t[kept], values[kept]
+    return {"t": t.tolist(), "v": values.tolist()}
+
+
+def compact_trades(trades_list):
+    """List of trade dicts -> {"t": [epoch seconds], "action": [...], "price": [...]}"""
+    return {
+        "t": _epoch_seconds([trade['timestamp'] for trade in trades_list]) if trades_list else [],
+        "action": [trade['action'] for trade in trades_list],
+        "price": [trade['price'] for trade in trades_list],
+    }
+
+
+def columnar_results(entries):
+    """
+    [{"parameters": {...}, "stats": {...}}, ...] -> one array per parameter
+    and per stat: {"parameters": {name: [...]}, "stats": {metric: [...]}}
+    """
+    param_names = list(dict.fromkeys(name for entry in entries for name in entry["parameters"]))
+    stat_names = list(entries[0]["stats"]) if entries else []
+    return {
+        "parameters": {name: [entry["parameters"].get(name) for entry in entries] for name in param_names},
+        "stats": {name: [entry["stats"][name] for entry in entries] for name in stat_names},
+    }
@@ -0,0 +1,355 @@
+import json
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.engine import (
+    latch, _lagged_signal, apply_exits, backtest, load_range, _summary_stats,
+)
+from app.backtest.indicator_cache import IndicatorCache
+from app.data.indicators import INDICATOR_FUNCTIONS
+
+
+class DSLError(ValueError):
+    """Raised for expressions the strategy DSL cannot parse or resolve"""
+
+
+# --- Tokenizer / Parser ---
+
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([A-Za-z_][A-Za-z0-9_.]*)|(<=|>=|==|!=|<|>|\(|\)|,|\+|-|\*|/))")
+_KEYWORDS = {'and', 'or', 'not', 'crosses', 'above', 'below'}
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise DSLError(f"Unexpected character at position {pos}: {text[pos:pos + 10]!r}")
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(('num', float(number)))
+        elif name is not None:
+            tokens.append(('kw', name.lower()) if name.lower() in _KEYWORDS else ('name', name))
+        else:
+            tokens.append(('op', op))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser producing tuple nodes:
+
+        expr   := and ('or' and)*
+        and    := not ('and' not)*
+        not    := 'not' not | cmp
+        cmp    := sum (('<' | '<=' | '>' | '>=' | '==' | '!=' | 'crosses above' | 'crosses below') sum)?
+        sum    := term (('+' | '-') term)*
+        term   := factor (('*' | '/') factor)*
+        factor := number | name | name '(' number (',' number)* ')' | '(' expr ')' | '-' factor
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None:
+            raise DSLError(f"Expected {value or kind or 'more input'}, got end of expression")
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            raise DSLError(f"Expected {value or kind}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise DSLError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expr(self):
+        node = self.and_()
+        while self.peek() == ('kw', 'or'):
+            self.take()
+            node = ('or', node, self.and_())
+        return node
+
+    def and_(self):
+        node = self.not_()
+        while self.peek() == ('kw', 'and'):
+            self.take()
+            node = ('and', node, self.not_())
+        return node
+
+    def not_(self):
+        if self.peek() == ('kw', 'not'):
+            self.take()
+            return ('not', self.not_())
+        return self.cmp()
+
+    def cmp(self):
+        left = self.sum()
+        kind, value = self.peek()
+        if kind == 'op' and value in ('<', '<=', '>', '>=', '==', '!='):
+            self.take()
+            return ('cmp', value, left, self.sum())
+        if (kind, value) == ('kw', 'crosses'):
+            self.take()
+            direction = self.take()[1]
+            if direction not in ('above', 'below'):
+                raise DSLError(f"Expected 'above' or 'below' after 'crosses', got {direction!r}")
+            return ('cross', direction, left, self.sum())
+        return left
+
+    def sum(self):
+        node = self.term()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            node = ('arith', self.take()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek() in (('op', '*'), ('op', '/')):
+            node = ('arith', self.take()[1], node, self.factor())
+        return node
+
+    def factor(self):
+        kind, value = self.peek()
+        if kind == 'num':
+            self.take()
+            return ('num', value)
+        if (kind, value) == ('op', '-'):
+            self.take()
+            return ('arith', '-', ('num', 0.0), self.factor())
+        if (kind, value) == ('op', '('):
+            self.take()
+            node = self.expr()
+            self.take('op', ')')
+            return node
+        if kind == 'name':
+            self.take()
+            args = []
+            if self.peek() == ('op', '('):
+                self.take()
+                args.append(self.take('num')[1])
+                while self.peek() == ('op', ','):
+                    self.take()
+                    args.append(self.take('num')[1])
+                self.take('op', ')')
+            return ('name', value, tuple(args))
+        raise DSLError("Unexpected end of expression" if kind is None else f"Unexpected {value!r}")
+
+
+@lru_cache(maxsize=1024)
+def parse_expression(text):
+    """Parse one entry/exit expression into an AST (memoized per expression)"""
+    return _Parser(text).parse()
+
+
+# --- Name Resolution ---
+
+_PRICE_COLUMNS = {'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'volume',
+                  'price': 'close'}
+
+# name -> (INDICATOR_FUNCTIONS key, default window, DataFrame column prefix)
+_INDICATORS = {
+    'sma': ('sma', 14, None), 'ma': ('sma', 14, None),
+    'ema': ('ema', 14, None),
+    'rsi': ('rsi', 14, None),
+    'macd': ('macd', None, 'MACD_'), 'macd_signal': ('macd', None, 'MACDs_'), 'macd_hist': ('macd', None, 'MACDh_'),
+    'bb_lower': ('bbands', 20, 'BBL_'), 'bb_mid': ('bbands', 20, 'BBM_'), 'bb_upper': ('bbands', 20, 'BBU_'),
+    'bb_width': ('bbands', 20, 'BBB_'), 'bb_percent': ('bbands', 20, 'BBP_'),
+    'stoch_k': ('stoch', 14, 'STOCHk_'), 'stoch_d': ('stoch', 14, 'STOCHd_'), 'stoch': ('stoch', 14, 'STOCHk_'),
+    'willr': ('willr', 14, None), 'williams_r': ('willr', 14, None),
+}
+
+
+def _resolve_name(name, args, parameters):
+    """Turn a name into a column, indicator or constant node"""
+    if name in parameters:
+        value = parameters[name]
+        if not isinstance(value, (int, float)):
+            raise DSLError(f"Parameter {name!r} must be a number")
+        # e.g. "fast_ma": 20 -> SMA(20), "slow_ema": 50 -> EMA(50); anything else is a constant
+        lowered = name.lower()
+        if lowered.endswith('_ema'):
+            return ('ind', 'ema', int(value), None)
+        if lowered.endswith('_ma') or lowered.endswith('_sma'):
+            return ('ind', 'sma', int(value), None)
+        return ('num', float(value))
+
+    lowered = name.lower()
+    if lowered in _PRICE_COLUMNS and not args:
+        return ('col', _PRICE_COLUMNS[lowered])
+
+    # RSI, RSI(21), rsi_21, SMA_50, bb_upper(20)
+    base, window = lowered, None
+    match = re.fullmatch(r"(.+?)_(\d+)", lowered)
+    if lowered not in _INDICATORS and match:
+        base, window = match.group(1), int(match.group(2))
+    if base not in _INDICATORS:
+        raise DSLError(f"Unknown name {name!r}")
+
+    kind, default_window, column = _INDICATORS[base]
+    if args:
+        window = int(args[0])
+    return ('ind', kind, window or default_window, column)
+
+
+def _resolve(node, parameters):
+    tag = node[0]
+    if tag == 'name':
+        return _resolve_name(node[1], node[2], parameters)
+    if tag == 'num':
+        return node
+    if tag == 'not':
+        return ('not', _resolve(node[1], parameters))
+    if tag in ('and', 'or'):
+        return (tag, _resolve(node[1], parameters), _resolve(node[2], parameters))
+    return (tag, node[1], _resolve(node[2], parameters), _resolve(node[3], parameters))
+
+
+@lru_cache(maxsize=256)
+def _compile(key):
+    parameters = json.loads(key)
+    numeric = {name: value for name, value in parameters.items()
+               if isinstance(value, (int, float)) and not isinstance(value, bool)}
+    compiled = {}
+    for field in ('entry_signal', 'exit_signal'):
+        text = parameters.get(field)
+        compiled[field] = _resolve(parse_expression(text), numeric) if text else None
+    if compiled['entry_signal'] is None:
+        raise DSLError("Strategy needs an entry_signal")
+    return compiled
+
+
+def compile_strategy(parameters):
+    """
+    Compile a strategy's `parameters` block (entry_signal / exit_signal plus
+    numeric parameters they may reference) into resolved ASTs. Compiled
+    strategies are memoized by the block's JSON.
+    """
+    return _compile(json.dumps(parameters, sort_keys=True))
+
+
+# --- Evaluation ---
+
+def _indicator_values(df, kind, window, column, cache):
+    def compute():
+        func = INDICATOR_FUNCTIONS[kind]
+        result = func(df) if window is None else func(df, window)
+        if isinstance(result, pd.DataFrame):
+            matches = [col for col in result.columns if col.startswith(column)]
+            if not matches:
+                raise DSLError(f"{kind} has no {column} output")
+            result = result[matches[0]]
+        if result is None:
+            return np.full(len(df), np.nan)
+        # Some pandas_ta outputs skip the warm-up rows; align back to the frame
+        return result.reindex(df.index).to_numpy(dtype=float)
+
+    return cache.get(f"dsl:{kind}", (window, column), df, compute)
+
+
+def evaluate(node, df, cache):
+    """Evaluate a resolved AST over the whole frame; returns a float or bool array"""
+    tag = node[0]
+    if tag == 'num':
+        return np.full(len(df), node[1])
+    if tag == 'col':
+        return df[node[1]].to_numpy(dtype=float)
+    if tag == 'ind':
+        return _indicator_values(df, node[1], node[2], node[3], cache)
+    if tag == 'not':
+        return ~evaluate(node[1], df, cache).astype(bool)
+    if tag == 'and':
+        return evaluate(node[1], df, cache).astype(bool) & evaluate(node[2], df, cache).astype(bool)
+    if tag == 'or':
+        return evaluate(node[1], df, cache).astype(bool) | evaluate(node[2], df, cache).astype(bool)
+
+    left = evaluate(node[2], df, cache)
+    right = evaluate(node[3], df, cache)
+    op = node[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if tag == 'arith':
+            return {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}[op](left, right)
+        if tag == 'cmp':
+            return {'<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+                    '==': np.equal, '!=': np.not_equal}[op](left, right)
+        if tag == 'cross':
+            prev_left = np.r_[np.nan, left[:-1]]
+            prev_right = np.r_[np.nan, right[:-1]]
+            if op == 'above':
+                return (left > right) & (prev_left <= prev_right)
+            return (left < right) & (prev_left >= prev_right)
+    raise DSLError(f"Unknown node {tag!r}")
+
+
+def strategy_signals(df, parameters, cache=None):
+    """
+    Lagged 0/1 position series for a DSL strategy: long from an entry bar
+    until an exit bar (or, without an exit_signal, while the entry condition
+    holds), with any stop_loss / take_profit / trailing_stop applied.
+    """
+    if cache is None:
+        cache = IndicatorCache()
+    compiled = compile_strategy(parameters)
+
+    entry = evaluate(compiled['entry_signal'], df, cache).astype(bool)
+    if compiled['exit_signal'] is None:
+        positions = entry.astype(float)
+    else:
+        positions = latch(entry, evaluate(compiled['exit_signal'], df, cache).astype(bool))
+
+    signals = _lagged_signal(positions, df.index)
+    return apply_exits(df, signals, parameters.get('stop_loss'), parameters.get('take_profit'),
+                       parameters.get('trailing_stop'))
+
+
+def custom_backtest(strategy, initial_capital, asset_type, symbol, interval, start_date, end_date):
+    """Backtest a JSON strategy config (as used by the Strategy Testing tab) on stored candles"""
+    parameters = strategy.get("parameters", strategy)
+    try:
+        compile_strategy(parameters)
+    except DSLError as e:
+        return {"status": "error", "message": f"Invalid strategy: {e}"}
+
+    df, error = load_range(asset_type, symbol, interval, start_date, end_date)
+    if error:
+        return error
+
+    try:
+        signals = strategy_signals(df, parameters)
+    except DSLError as e:
+        return {"status": "error", "message": f"Invalid strategy: {e}"}
+    stats = backtest(df, signals, initial_capital)
+    # backtest() returns a bare Series as the curve when the strategy never trades
+    equity_curve = stats['equity_curve'] if isinstance(stats['equity_curve'], list) else []
+
+    return {
+        "status": "success",
+        "data": {
+            "summary": {
+                "strategy_name": strategy.get("strategy_name"),
+                "symbol": symbol,
+                "interval": interval,
+                "data_points": len(df),
+                "from": str(df.index[0]),
+                "to": str(df.index[-1]),
+            },
+            "stats": {
+                **_summary_stats(stats, initial_capital),
+                "equity_curve": equity_curve,
+                "trades_list": stats.get('trades_list', []),
+            },
+        }
+    }
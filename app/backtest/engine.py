@@ -1,10 +1,18 @@
 import pandas as pd
 import numpy as np
-import sqlite3
 from itertools import product
 import pandas_ta as ta
 from collections import defaultdict
 import warnings
+import heapq
+import sys
+
+from app.backtest.compact import lttb, compact_curve, compact_trades, columnar_results
+from app.backtest.indicator_cache import IndicatorCache, data_fingerprint
+from app.backtest.parallel import run_parallel, default_workers
+from app.backtest.result_store import get_result_store, params_key
+from app.data.candles import load_candles
+
 warnings.filterwarnings('ignore')
 
 # --- Performance Metrics ---
@@ -68,84 +76,108 @@ def compute_equity_curve(df, signal, initial_capital):
 
 # --- Enhanced Strategy Implementations ---
 
-def sma_crossover(df, short, long):
+def latch(enter, exit, start=1):
+    """
+    Loop-free enter/exit latch (hysteresis).
+
+    Goes long (1) on bars where `enter` is true, flat (0) on bars where only
+    `exit` is true, and otherwise holds the previous position. Bars before
+    `start` are flat and ignore both conditions. Accepts 1-D arrays or 2-D
+    (bars x combos) arrays, latching every column independently.
+    """
+    enter = np.asarray(enter, dtype=bool)
+    exit = np.asarray(exit, dtype=bool)
+
+    state = np.where(enter, 1.0, np.where(exit, 0.0, np.nan))
+    state[:start] = np.nan
+
+    # Forward-fill the last set state down the bar axis
+    n = state.shape[0]
+    bar_idx = np.arange(n).reshape((n,) + (1,) * (state.ndim - 1))
+    last_set = np.where(np.isnan(state), 0, bar_idx)
+    np.maximum.accumulate(last_set, axis=0, out=last_set)
+    filled = np.take_along_axis(state, last_set, axis=0)
+
+    return np.nan_to_num(filled, nan=0.0)
+
+def threshold_latch(values, thresholds, start=1):
+    """
+    Batched latch for oscillator thresholds: long below `low`, flat above `high`.
+
+    `thresholds` is a (low, high) pair or a 2-D array of shape (pairs, 2);
+    the result has shape (bars,) or (bars, pairs) respectively.
+    """
+    values = np.asarray(values, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+
+    if thresholds.ndim == 1:
+        return latch(values < thresholds[0], values > thresholds[1], start)
+
+    col = values[:, None]
+    return latch(col < thresholds[None, :, 0], col > thresholds[None, :, 1], start)
+
+def _lagged_signal(positions, index):
+    """Shift a position array one bar forward so trades act on the next bar"""
+    return pd.Series(positions, index=index).shift(1).fillna(0)
+
+def _crossover_signal(fast, slow, index):
+    """
+    Long (1) while fast > slow, flat (0) otherwise.
+    Bars where either line is NaN compare false both ways and therefore carry
+    the previous value; the first bar is always flat.
+    """
+    fast = fast.to_numpy(dtype=float)
+    slow = slow.to_numpy(dtype=float)
+    return _lagged_signal(latch(fast > slow, fast <= slow), index)
+
+def _indicator(cache, name, params, df, compute):
+    """Fetch an indicator through the run's IndicatorCache, or compute it directly"""
+    if cache is None:
+        return compute()
+    return cache.get(name, params, df, compute)
+
+def sma_crossover(df, short, long, cache=None):
     """Simple Moving Average Crossover Strategy"""
     if short >= long or long >= len(df) * 0.8:  # Need at least 20% of data after indicator calculation
         return pd.Series(0, index=df.index)
     
-    df = df.copy()
-    df['sma_short'] = ta.sma(df['close'], length=short)
-    df['sma_long'] = ta.sma(df['close'], length=long)
+    sma_short = _indicator(cache, 'sma', (short,), df, lambda: ta.sma(df['close'], length=short))
+    sma_long = _indicator(cache, 'sma', (long,), df, lambda: ta.sma(df['close'], length=long))
     
     # Check if we have valid data
-    if df['sma_short'].isna().all() or df['sma_long'].isna().all():
+    if sma_short is None or sma_long is None or sma_short.isna().all() or sma_long.isna().all():
         return pd.Series(0, index=df.index)
     
-    # Fill NaN values with 0 for comparison, then create signal
-    sma_short_filled = df['sma_short'].fillna(0)
-    sma_long_filled = df['sma_long'].fillna(0)
-    
-    signal = pd.Series(0, index=df.index)
-    for i in range(1, len(df)):
-        if pd.notna(df['sma_short'].iloc[i]) and pd.notna(df['sma_long'].iloc[i]):
-            if df['sma_short'].iloc[i] > df['sma_long'].iloc[i]:
-                signal.iloc[i] = 1
-            else:
-                signal.iloc[i] = 0
-        else:
-            signal.iloc[i] = signal.iloc[i-1] if i > 0 else 0
-    
-    return signal.shift(1).fillna(0)
+    return _crossover_signal(sma_short, sma_long, df.index)
 
-def ema_crossover(df, short, long):
+def ema_crossover(df, short, long, cache=None):
     """Exponential Moving Average Crossover Strategy"""
     if short >= long or long >= len(df) * 0.8:  # Need at least 20% of data after indicator calculation
         return pd.Series(0, index=df.index)
     
-    df = df.copy()
-    df['ema_short'] = ta.ema(df['close'], length=short)
-    df['ema_long'] = ta.ema(df['close'], length=long)
+    ema_short = _indicator(cache, 'ema', (short,), df, lambda: ta.ema(df['close'], length=short))
+    ema_long = _indicator(cache, 'ema', (long,), df, lambda: ta.ema(df['close'], length=long))
     
     # Check if we have valid data
-    if df['ema_short'].isna().all() or df['ema_long'].isna().all():
+    if ema_short is None or ema_long is None or ema_short.isna().all() or ema_long.isna().all():
         return pd.Series(0, index=df.index)
     
-    signal = pd.Series(0, index=df.index)
-    for i in range(1, len(df)):
-        if pd.notna(df['ema_short'].iloc[i]) and pd.notna(df['ema_long'].iloc[i]):
-            if df['ema_short'].iloc[i] > df['ema_long'].iloc[i]:
-                signal.iloc[i] = 1
-            else:
-                signal.iloc[i] = 0
-        else:
-            signal.iloc[i] = signal.iloc[i-1] if i > 0 else 0
-    
-    return signal.shift(1).fillna(0)
+    return _crossover_signal(ema_short, ema_long, df.index)
 
-def rsi_strategy(df, low, high, length=14):
+def rsi_strategy(df, low, high, length=14, cache=None):
     """RSI Mean Reversion Strategy with proper state management"""
-    df = df.copy()
-    df['rsi'] = ta.rsi(df['close'], length=length)
+    rsi = _indicator(cache, 'rsi', (length,), df, lambda: ta.rsi(df['close'], length=length))
+    if rsi is None:
+        return pd.Series(0, index=df.index)
     
     # Proper RSI strategy: buy when oversold, sell when overbought, hold in between
-    signal = pd.Series(0, index=df.index)
-    position = 0
-    
-    for i in range(1, len(df)):
-        if pd.notna(df['rsi'].iloc[i]):
-            if df['rsi'].iloc[i] < low:
-                position = 1  # Buy signal
-            elif df['rsi'].iloc[i] > high:
-                position = 0  # Sell signal
-            # Otherwise maintain current position
-        signal.iloc[i] = position
-    
-    return signal.shift(1).fillna(0)
+    positions = threshold_latch(rsi, (low, high))
+    return _lagged_signal(positions, df.index)
 
-def macd_strategy(df, fast=12, slow=26, signal_period=9):
+def macd_strategy(df, fast=12, slow=26, signal_period=9, cache=None):
     """MACD Strategy"""
-    df = df.copy()
-    macd_data = ta.macd(df['close'], fast=fast, slow=slow, signal=signal_period)
+    macd_data = _indicator(cache, 'macd', (fast, slow, signal_period), df,
+                           lambda: ta.macd(df['close'], fast=fast, slow=slow, signal=signal_period))
     if macd_data is None or macd_data.empty:
         return pd.Series(0, index=df.index)
     
@@ -153,23 +185,12 @@ def macd_strategy(df, fast=12, slow=26, signal_period=9):
     macd_line = macd_data.iloc[:, 0].reindex(df.index, fill_value=np.nan)  # MACD line
     signal_line = macd_data.iloc[:, 1].reindex(df.index, fill_value=np.nan)  # Signal line
     
-    signal = pd.Series(0, index=df.index)
-    
-    for i in range(1, len(df)):
-        if pd.notna(macd_line.iloc[i]) and pd.notna(signal_line.iloc[i]):
-            if macd_line.iloc[i] > signal_line.iloc[i]:
-                signal.iloc[i] = 1
-            else:
-                signal.iloc[i] = 0
-        else:
-            signal.iloc[i] = signal.iloc[i-1] if i > 0 else 0
-    
-    return signal.shift(1).fillna(0)
+    return _crossover_signal(macd_line, signal_line, df.index)
 
-def bollinger_strategy(df, window, stddev):
+def bollinger_strategy(df, window, stddev, cache=None):
     """Bollinger Bands Mean Reversion Strategy"""
-    df = df.copy()
-    bb = ta.bbands(df['close'], length=window, std=stddev)
+    bb = _indicator(cache, 'bbands', (window, stddev), df,
+                    lambda: ta.bbands(df['close'], length=window, std=stddev))
     if bb is None or bb.empty:
         return pd.Series(0, index=df.index)
     
@@ -177,82 +198,115 @@ def bollinger_strategy(df, window, stddev):
     lower_band = bb.iloc[:, 0].reindex(df.index, fill_value=np.nan)  # Lower band
     upper_band = bb.iloc[:, 2].reindex(df.index, fill_value=np.nan)  # Upper band
     
-    signal = pd.Series(0, index=df.index)
-    position = 0
-    
-    for i in range(1, len(df)):
-        if pd.notna(lower_band.iloc[i]) and pd.notna(upper_band.iloc[i]):
-            if df['close'].iloc[i] <= lower_band.iloc[i]:
-                position = 1  # Buy
-            elif df['close'].iloc[i] >= upper_band.iloc[i]:
-                position = 0  # Sell
-        signal.iloc[i] = position
-    
-    return signal.shift(1).fillna(0)
+    close = df['close'].to_numpy(dtype=float)
+    positions = latch(close <= lower_band.to_numpy(), close >= upper_band.to_numpy())
+    return _lagged_signal(positions, df.index)
 
-def stochastic_strategy(df, k_period=14, d_period=3, oversold=20, overbought=80):
+def stochastic_strategy(df, k_period=14, d_period=3, oversold=20, overbought=80, cache=None):
     """Stochastic Oscillator Strategy"""
-    df = df.copy()
-    stoch = ta.stoch(df['high'], df['low'], df['close'], k=k_period, d=d_period)
+    stoch = _indicator(cache, 'stoch', (k_period, d_period), df,
+                       lambda: ta.stoch(df['high'], df['low'], df['close'], k=k_period, d=d_period))
     if stoch is None or stoch.empty:
         return pd.Series(0, index=df.index)
     
     # Get the %K column (first column) and align with df index
     k_line = stoch.iloc[:, 0].reindex(df.index, fill_value=np.nan)
     
-    signal = pd.Series(0, index=df.index)
-    position = 0
-    
-    for i in range(1, len(df)):
-        if pd.notna(k_line.iloc[i]):
-            if k_line.iloc[i] < oversold:
-                position = 1
-            elif k_line.iloc[i] > overbought:
-                position = 0
-        signal.iloc[i] = position
-    
-    return signal.shift(1).fillna(0)
+    positions = threshold_latch(k_line, (oversold, overbought))
+    return _lagged_signal(positions, df.index)
 
-def williams_r_strategy(df, period=14, oversold=-80, overbought=-20):
+def williams_r_strategy(df, period=14, oversold=-80, overbought=-20, cache=None):
     """Williams %R Strategy"""
-    df = df.copy()
-    wr = ta.willr(df['high'], df['low'], df['close'], length=period)
+    wr = _indicator(cache, 'willr', (period,), df,
+                    lambda: ta.willr(df['high'], df['low'], df['close'], length=period))
     if wr is None or wr.empty:
         return pd.Series(0, index=df.index)
     
     # Align Williams %R with df index
     wr = wr.reindex(df.index, fill_value=np.nan)
     
-    signal = pd.Series(0, index=df.index)
-    position = 0
-    
-    for i in range(1, len(df)):
-        if pd.notna(wr.iloc[i]):
-            if wr.iloc[i] < oversold:
-                position = 1
-            elif wr.iloc[i] > overbought:
-                position = 0
-        signal.iloc[i] = position
-    
-    return signal.shift(1).fillna(0)
+    positions = threshold_latch(wr, (oversold, overbought))
+    return _lagged_signal(positions, df.index)
 
-def momentum_strategy(df, period=10, threshold=0.02):
+def momentum_strategy(df, period=10, threshold=0.02, cache=None):
     """Price Momentum Strategy"""
-    df = df.copy()
-    df['momentum'] = df['close'].pct_change(periods=period)
-    
-    signal = pd.Series(0, index=df.index)
-    position = 0
+    momentum = _indicator(cache, 'momentum', (period,), df, lambda: df['close'].pct_change(periods=period))
     
-    for i in range(period, len(df)):
-        if pd.notna(df['momentum'].iloc[i]):
-            if df['momentum'].iloc[i] > threshold:
-                position = 1
-            elif df['momentum'].iloc[i] < -threshold:
-                position = 0
-        signal.iloc[i] = position
-    
-    return signal.shift(1).fillna(0)
+    momentum = momentum.to_numpy(dtype=float)
+    positions = latch(momentum > threshold, momentum < -threshold, start=period)
+    return _lagged_signal(positions, df.index)
+
+# --- Exit Overlays ---
+
+def apply_exits(df, signals, stop_loss=None, take_profit=None, trailing_stop=None):
+    """
+    Overlay percentage stop-loss, take-profit and trailing-stop exits on a
+    lagged 0/1 strategy signal, without a per-bar loop.
+
+    A trade is a run of held bars, entered at the close before its first bar.
+    Each bar's low/high is checked against the trade's levels (the trailing
+    stop trails the highest high of the earlier bars of the trade). After the
+    first hit the exit fills at that bar's close and the position stays flat
+    until the base signal goes flat and enters again.
+    """
+    if not (stop_loss or take_profit or trailing_stop):
+        return signals
+
+    positions = np.asarray(signals, dtype=float)
+    held = positions > 0
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+
+    # Broadcast each trade's first bar (and so its entry price) along the trade
+    first = held & ~np.r_[False, held[:-1]]
+    bars = np.arange(len(positions))
+    first_bar = np.maximum.accumulate(np.where(first, bars, 0))
+    entry = np.r_[close[0], close[:-1]][first_bar]
+
+    hit = np.zeros(len(positions), dtype=bool)
+    if stop_loss:
+        hit |= low <= entry * (1 - stop_loss)
+    if take_profit:
+        hit |= high >= entry * (1 + take_profit)
+    if trailing_stop:
+        trade = np.where(held, first_bar, -1)
+        running_high = pd.Series(high).groupby(trade).cummax().to_numpy()
+        prior_high = np.where(first, entry, np.r_[entry[0], running_high[:-1]])
+        hit |= low <= np.maximum(prior_high, entry) * (1 - trailing_stop)
+    hit &= held
+
+    # Hits on earlier bars of the same trade
+    hits = np.cumsum(hit)
+    earlier = hits - hit - (hits - hit)[first_bar]
+    exited = held & (earlier > 0)
+
+    if isinstance(signals, pd.Series):
+        return pd.Series(np.where(exited, 0.0, positions), index=signals.index)
+    return np.where(exited, 0.0, positions)
+
+class WithExits:
+    """
+    Strategy wrapper taking extra stop_loss / take_profit / trailing_stop
+    params and applying apply_exits() to the base strategy's signal.
+    A class rather than a closure so it can be sent to worker processes.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, df, stop_loss=None, take_profit=None, trailing_stop=None, cache=None, **params):
+        # The base signal is shared by every exit combo of the same params
+        base = _indicator(cache, f"signal:{self.func.__name__}", tuple(sorted(params.items())), df,
+                          lambda: self.func(df, **params, cache=cache))
+        return apply_exits(df, base, stop_loss, take_profit, trailing_stop)
+
+# Example exit dimensions for grid_search(exits=...); None disables that exit
+EXIT_GRID = {
+    'stop_loss': [None, 0.02, 0.05, 0.1],
+    'take_profit': [None, 0.05, 0.1, 0.2],
+    'trailing_stop': [None, 0.03, 0.05],
+}
 
 # --- Enhanced Strategy Grid with adaptive parameters ---
 
@@ -308,9 +362,10 @@ def sanitize(value):
 
 # --- Enhanced Backtest Function ---
 
-def backtest(df, signals, initial_capital=10000, transaction_cost=0.001):
+def backtest(df, signals, initial_capital=10000, transaction_cost=0.001, include_curve=True):
     """
-    Enhanced backtest with transaction costs and multiple metrics
+    Enhanced backtest with transaction costs and multiple metrics.
+    With `include_curve=False` only the metrics are returned (no equity curve or trade list).
     """
     if len(signals) == 0 or signals.sum() == 0:
         return {
@@ -319,13 +374,6 @@ def backtest(df, signals, initial_capital=10000, transaction_cost=0.001):
             'annual_return': 0, 'volatility': 0, 'equity_curve': pd.Series([initial_capital])
         }
 
-    trades_list = []
-    for i in range(1, len(signals)):
-        if signals.iloc[i] > signals.iloc[i - 1]:
-            trades_list.append({'timestamp': str(df.index[i]), 'action': 'buy', 'price': float(df['close'].iloc[i])})
-        elif signals.iloc[i] < signals.iloc[i - 1]:
-            trades_list.append({'timestamp': str(df.index[i]), 'action': 'sell', 'price': float(df['close'].iloc[i])})
-    
     returns = df['close'].pct_change().fillna(0)
     
     # Apply transaction costs when position changes
@@ -354,9 +402,7 @@ def backtest(df, signals, initial_capital=10000, transaction_cost=0.001):
     annual_return = (1 + strategy_returns.mean()) ** 252 - 1
     volatility = strategy_returns.std() * np.sqrt(252)
 
-    cleaned_equity_curve = equity_curve.replace([np.inf, -np.inf], np.nan).fillna(method='ffill').fillna(method='bfill')
-
-    return {
+    stats = {
     'pnl': sanitize(pnl),
     'sharpe': sanitize(sr),
     'sortino': sanitize(sortino),
@@ -366,55 +412,296 @@ def backtest(df, signals, initial_capital=10000, transaction_cost=0.001):
     'trades': int(trades),
     'annual_return': sanitize(annual_return),
     'volatility': sanitize(volatility),
-    'equity_curve': [
+    }
+    if not include_curve:
+        return stats
+
+    # Only bars where the position steps up (buy) or down (sell) become trades
+    step = np.diff(np.asarray(signals, dtype=float))
+    close = df['close'].to_numpy(dtype=float)
+    trades_list = [
+        {'timestamp': str(df.index[i]), 'action': 'buy' if step[i - 1] > 0 else 'sell', 'price': float(close[i])}
+        for i in np.flatnonzero((step > 0) | (step < 0)) + 1
+    ]
+
+    cleaned_equity_curve = equity_curve.replace([np.inf, -np.inf], np.nan).fillna(method='ffill').fillna(method='bfill')
+    stats['equity_curve'] = [
         [str(date), sanitize(value)] for date, value in cleaned_equity_curve.items()
-    ],
-    'trades_list': trades_list
+    ]
+    stats['trades_list'] = trades_list
+    return stats
+
+
+# --- Batched (Matrix) Backtest ---
+
+# Bump when a change alters backtest results, so cached results are not reused
+ENGINE_VERSION = "1"
+
+METRIC_KEYS = ['pnl', 'sharpe', 'sortino', 'calmar', 'max_drawdown', 'win_rate',
+               'trades', 'annual_return', 'volatility']
+
+def _sanitize_array(values):
+    """Vectorized sanitize(): NaN and +/-inf become 0.0"""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isfinite(values), values, 0.0)
+
+def _column_std(values, count):
+    """Sample std (ddof=1) per column of `values` over `count` rows; NaN when count < 2"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = values.sum(axis=0) / count
+        var = ((values - mean) ** 2).sum(axis=0) / (count - 1)
+    return np.sqrt(var), mean
+
+def returns_metrics(strategy_returns, initial_capital=10000):
+    """
+    Batched metric kernel over a (bars x columns) matrix of per-bar strategy
+    returns. Returns 1-D arrays for every backtest() metric except `trades`.
+    """
+    strat = np.asfortranarray(np.asarray(strategy_returns, dtype=float))
+    if strat.ndim == 1:
+        strat = strat[:, None]
+    m, k = strat.shape
+
+    if m == 0:
+        return {key: np.zeros(k) for key in METRIC_KEYS if key != 'trades'}
+
+    equity = np.cumprod(1 + strat, axis=0) * initial_capital
+    pnl = equity[-1] - initial_capital
+
+    std, mean = _column_std(strat, m)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        sharpe = np.where(std == 0, 0.0, np.sqrt(252) * mean / std)
+
+        downside = strat < 0
+        down_count = downside.sum(axis=0)
+        down_mean = np.where(downside, strat, 0).sum(axis=0) / down_count
+        down_var = (np.where(downside, strat - down_mean, 0) ** 2).sum(axis=0) / (down_count - 1)
+        down_std = np.sqrt(down_var)
+        sortino = np.where((down_count == 0) | (down_std == 0), 0.0, np.sqrt(252) * mean / down_std)
+
+        roll_max = np.maximum.accumulate(equity, axis=0)
+        mdd = ((equity - roll_max) / roll_max).min(axis=0)
+
+        annual_return = (1 + mean) ** 252 - 1
+        calmar = np.where(np.abs(mdd) == 0, 0.0, annual_return / np.abs(mdd))
+
+        # The NaN first bar counts as a non-zero return in backtest()'s win-rate denominator
+        nonzero = (strat != 0).sum(axis=0) + 1
+        wr = (strat > 0).sum(axis=0) / nonzero
+
+    volatility = std * np.sqrt(252)
+
+    return {
+        'pnl': _sanitize_array(pnl),
+        'sharpe': _sanitize_array(sharpe),
+        'sortino': _sanitize_array(sortino),
+        'calmar': _sanitize_array(calmar),
+        'max_drawdown': _sanitize_array(mdd),
+        'win_rate': _sanitize_array(wr),
+        'annual_return': _sanitize_array(annual_return),
+        'volatility': _sanitize_array(volatility),
     }
 
+def strategy_returns(close, signal_matrix, transaction_cost=0.001):
+    """
+    Per-bar strategy returns (bars-1 x combos) and position changes, as used by
+    backtest(). Row 0 has no position change (NaN in pandas) and is dropped.
+    """
+    close = pd.Series(np.asarray(close, dtype=float))
+    signals = np.asarray(signal_matrix, dtype=float)
+    if signals.ndim == 1:
+        signals = signals[:, None]
 
-# --- Enhanced Grid Search ---
-def grid_search(df, initial_capital=10000, ranking_metric='sharpe'):
-    all_results = defaultdict(list)
-    strategy_grid = get_adaptive_strategy_grid(len(df))
+    returns = close.pct_change().fillna(0).to_numpy()
+    changes = np.abs(np.diff(signals, axis=0))
+    return signals[1:] * returns[1:, None] - changes * transaction_cost, changes
 
-    print(f"Adaptive parameter grid created for {len(df)} data points")
+def backtest_matrix(close, signal_matrix, initial_capital=10000, transaction_cost=0.001):
+    """
+    Evaluate many signal columns against one price series in a single NumPy pass.
 
-    for strat_name, details in strategy_grid.items():
-        func = details['func']
-        param_grid = details['params']
-        print(f"Testing {strat_name} strategy...")
+    `signal_matrix` has shape (bars x combos). Returns a dict of 1-D arrays
+    (one value per combo) for every metric reported by backtest(), with the
+    same NaN handling as the per-combo pandas implementation.
+    """
+    signals = np.asarray(signal_matrix, dtype=float)
+    if signals.ndim == 1:
+        signals = signals[:, None]
+    n, k = signals.shape
 
-        if not param_grid or not any(param_grid.values()):
-            continue
+    if n < 2:
+        empty = {key: np.zeros(k) for key in METRIC_KEYS}
+        empty['trades'] = np.zeros(k, dtype=int)
+        return empty
 
-        keys, values = zip(*param_grid.items())
-        total_combos = len(list(product(*values)))
-        completed = 0
+    strat, changes = strategy_returns(close, signals, transaction_cost)
+    metrics = returns_metrics(strat, initial_capital)
+    metrics['trades'] = changes.sum(axis=0).astype(int)
 
-        for combo in product(*values):
-            params = dict(zip(keys, combo))
+    # Match backtest()'s early return for signals that are never in the market
+    inactive = signals.sum(axis=0) == 0
+    if inactive.any():
+        for key in METRIC_KEYS:
+            metrics[key][inactive] = 0
 
-            # Validate
-            if strat_name in ['SMA', 'EMA'] and params['short'] >= params['long']:
-                continue
-            if strat_name == 'RSI' and params['low'] >= params['high']:
-                continue
-            if strat_name in ['Stochastic', 'Williams_R'] and params['oversold'] >= params['overbought']:
-                continue
+    return metrics
+
+def _matrix_stats(metrics, j):
+    """Per-combo stats dict (without curves) from backtest_matrix() output"""
+    stats = {key: float(metrics[key][j]) for key in METRIC_KEYS}
+    stats['trades'] = int(metrics['trades'][j])
+    return stats
+
+
+# --- Enhanced Grid Search ---
+
+def is_valid_combo(strat_name, params):
+    """Reject parameter combinations that make no sense for the strategy"""
+    if strat_name in ['SMA', 'EMA'] and params['short'] >= params['long']:
+        return False
+    if strat_name == 'RSI' and params['low'] >= params['high']:
+        return False
+    if strat_name in ['Stochastic', 'Williams_R'] and params['oversold'] >= params['overbought']:
+        return False
+    if strat_name == 'MACD' and params['fast'] >= params['slow']:
+        return False
+    return True
+
+def _valid_combos(strat_name, param_grid):
+    """Yield the parameter dicts of a strategy grid, skipping invalid combinations"""
+    keys, values = zip(*param_grid.items())
+    for combo in product(*values):
+        params = dict(zip(keys, combo))
+        if is_valid_combo(strat_name, params):
+            yield params
+
+def _evaluate_combos(df, strat_name, func, combos, initial_capital, cache, chunk_size=64, min_trades=1):
+    """
+    Generate signals for `combos` and score them with backtest_matrix() in chunks.
+    Each distinct signal vector is backtested once; combos that repeat a signal
+    already seen by `cache` (in this or any earlier call) share its stats.
+    """
+    if cache is None:
+        cache = IndicatorCache()
+    results = []
+    close = df['close'].to_numpy(dtype=float)
 
+    for start in range(0, len(combos), chunk_size):
+        chunk = []  # (params, signal key)
+        pending = {}  # signal key -> column in this chunk's matrix
+        known = {}  # signal key -> stats for this chunk (memoized entries may be evicted meanwhile)
+        columns = []
+        for params in combos[start:start + chunk_size]:
             try:
-                signals = func(df.copy(), **params)
-                stats = backtest(df, signals, initial_capital)
-                if stats['trades'] > 0:
-                    all_results[strat_name].append((params, stats))
+                signals = np.asarray(func(df, **params, cache=cache), dtype=float)
             except Exception as e:
                 print(f"[ERROR] {strat_name} {params} failed: {e}")
+                continue
+
+            key = cache.signal_key(df, signals, initial_capital)
+            chunk.append((params, key))
+            if key not in known and key not in pending:
+                stats = cache.signal_result(key)
+                if stats is not None:
+                    known[key] = stats
+            if key in known or key in pending:
+                cache.duplicate_signals += 1
+                continue
+            pending[key] = len(columns)
+            columns.append(signals)
+
+        if columns:
+            metrics = backtest_matrix(close, np.column_stack(columns), initial_capital)
+            for key, j in pending.items():
+                known[key] = _matrix_stats(metrics, j)
+                cache.store_signal_result(key, known[key])
+
+        for params, key in chunk:
+            stats = known[key]
+            if stats['trades'] >= min_trades:
+                results.append((params, dict(stats)))
+
+    return results
+
+# --- Successive Halving ---
+
+HALVING_DEFAULTS = {'eta': 3, 'min_fraction': 1/27, 'min_bars': 300}
+
+def halving_options(halving=None):
+    """HALVING_DEFAULTS overridden by `halving`; unknown keys or values that would never converge raise ValueError"""
+    unknown = set(halving or {}) - set(HALVING_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown halving options {sorted(unknown)} (expected {sorted(HALVING_DEFAULTS)})")
+    options = {**HALVING_DEFAULTS, **(halving or {})}
+    if options['eta'] < 2 or options['min_bars'] < 1 or not 0 < options['min_fraction'] <= 1:
+        raise ValueError("halving needs eta >= 2, min_bars >= 1 and 0 < min_fraction <= 1")
+    return options
+
+def halving_rungs(data_length, eta=3, min_fraction=1/27, min_bars=300):
+    """Prefix lengths evaluated by successive_halving(), ending with the full range"""
+    rungs = []
+    length = max(min_bars, int(np.ceil(data_length * min_fraction)))
+    while length < data_length:
+        rungs.append(length)
+        length *= eta
+    rungs.append(data_length)
+    return rungs
+
+def halving_evaluations(n_combos, n_rungs, eta=3):
+    """Total combo evaluations for a successive-halving run (used for progress totals)"""
+    total = 0
+    for _ in range(n_rungs):
+        total += n_combos
+        n_combos = max(1, int(np.ceil(n_combos / eta)))
+    return total
+
+def successive_halving(df, strat_name, func, combos, initial_capital, cache, ranking_metric='sharpe',
+                       eta=3, min_fraction=1/27, min_bars=300, progress=None):
+    """
+    Score all combos on a prefix of the data, keep the best 1/eta by
+    `ranking_metric`, extend the survivors to eta times more bars and repeat
+    until they have seen the full range. Only the final full-range stats
+    are returned, in the same (params, stats) format as _evaluate_combos().
+    """
+    rungs = halving_rungs(len(df), eta, min_fraction, min_bars)
+    survivors = list(combos)
+
+    for length in rungs[:-1]:
+        scored = _evaluate_combos(df.iloc[:length], strat_name, func, survivors, initial_capital,
+                                  cache, min_trades=0)
+        if progress is not None:
+            progress(len(survivors))
+
+        # Combos that never trade on the prefix rank last; ties keep grid order
+        ranked = sorted(
+            range(len(scored)),
+            key=lambda i: scored[i][1][ranking_metric] if scored[i][1]['trades'] > 0 else -np.inf,
+            reverse=True,
+        )
+        keep = sorted(ranked[:max(1, int(np.ceil(len(survivors) / eta)))])
+        survivors = [scored[i][0] for i in keep]
+
+    results = _evaluate_combos(df, strat_name, func, survivors, initial_capital, cache)
+    if progress is not None:
+        progress(len(survivors))
+    return results
+
+def _halving_task(df, task, cache):
+    """Process-pool entry point: run successive halving for one strategy"""
+    strat_name, func, combos, initial_capital, ranking_metric, options = task
+    return successive_halving(df, strat_name, func, combos, initial_capital, cache, ranking_metric, **options)
 
-            completed += 1
-            if completed % 20 == 0:
-                print(f"  Completed {completed}/{total_combos} combinations")
+def _evaluate_task(df, task, cache):
+    """Process-pool entry point: score one (strategy, combo chunk) task"""
+    strat_name, func, combos, initial_capital, min_trades = task
+    return _evaluate_combos(df, strat_name, func, combos, initial_capital, cache, min_trades=min_trades)
 
+def select_best(df, all_results, funcs, ranking_metric, initial_capital, cache=None, result_store=None):
+    """
+    Pick each strategy's best (params, stats) by `ranking_metric` and sort them.
+    Winners scored without curves are re-run through backtest() for their
+    equity curve and trade list (or read back from `result_store`).
+    """
     best_results = []
     for strat_name, result_list in all_results.items():
         if not result_list:
@@ -423,36 +710,235 @@ def grid_search(df, initial_capital=10000, ranking_metric='sharpe'):
             best = min(result_list, key=lambda x: -x[1][ranking_metric])
         else:
             best = max(result_list, key=lambda x: x[1][ranking_metric])
-        best_results.append((strat_name, best[0], best[1]))
+
+        best_stats = best[1]
+        if 'equity_curve' not in best_stats:
+            cached = result_store.get_full(strat_name, best[0]) if result_store is not None else None
+            if cached is not None:
+                best_stats = cached
+            else:
+                best_stats = backtest(df, funcs[strat_name](df, **best[0], cache=cache), initial_capital)
+                if result_store is not None:
+                    result_store.put_full(strat_name, best[0], best_stats)
+        best_results.append((strat_name, best[0], best_stats))
 
     if ranking_metric == 'max_drawdown':
         best_results.sort(key=lambda x: -x[2][ranking_metric])
     else:
         best_results.sort(key=lambda x: x[2][ranking_metric], reverse=True)
 
+    return best_results
+
+class TopK:
+    """
+    Bounded min-heap keeping the `k` best (params, stats) pairs by one
+    ranking metric. On ties the earlier pair wins, matching max() over a list.
+    """
+
+    def __init__(self, k, ranking_metric):
+        self.k = k
+        self.ranking_metric = ranking_metric
+        self.heap = []
+        self.seen = 0
+
+    def push(self, params, stats):
+        item = (stats[self.ranking_metric], -self.seen, params, stats)
+        self.seen += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def items(self):
+        """Kept pairs, best first"""
+        return [(params, stats) for _, _, params, stats in sorted(self.heap, key=lambda x: x[:2], reverse=True)]
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where the resource module is unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _print_progress(completed, total):
+    if completed == total or completed % 20 == 0:
+        print(f"  Completed {completed}/{total} combinations")
+
+def grid_search(df, initial_capital=10000, ranking_metric='sharpe', cache=None, vectorized=True,
+                workers=1, chunk_size=64, progress=None, search_mode='exhaustive', halving=None,
+                result_store=None, keep_top=None, exits=None):
+    """
+    Exhaustive search over get_adaptive_strategy_grid().
+
+    With `vectorized=True` (default) every combo of a strategy is scored in
+    backtest_matrix() chunks and only the per-strategy winners are re-run
+    through backtest() to build their equity curve and trade list.
+    With `workers > 1` the chunks are spread over a process pool that reads
+    the OHLCV data from shared memory; results are identical to the serial run.
+    `progress(completed, total)` is called as combos finish (printed by default).
+
+    `search_mode='halving'` replaces the exhaustive pass with
+    successive_halving() per strategy; `halving` may override its `eta`,
+    `min_fraction` and `min_bars` options.
+
+    `result_store` (a BoundResultStore from app.backtest.result_store) skips
+    combos whose metrics are already cached for this data slice and stores
+    the newly scored ones; it is used by the exhaustive vectorized search.
+
+    Only metrics are kept per combo; equity curves and trade lists are built
+    for the winners alone. With `keep_top=k` each strategy keeps just its k
+    best combos by `ranking_metric` in a bounded heap instead of all of them.
+
+    `exits` (e.g. EXIT_GRID) adds stop_loss / take_profit / trailing_stop
+    dimensions: every strategy combo is also tried with each exit combo.
+    """
+    all_results = defaultdict(list)
+    strategy_grid = get_adaptive_strategy_grid(len(df))
+    if progress is None:
+        progress = _print_progress
+
+    # Indicators are shared by many combos (e.g. SMA(200) for every `short`)
+    if cache is None:
+        cache = IndicatorCache()
+
+    print(f"Adaptive parameter grid created for {len(df)} data points")
+
+    plan = []
+    for strat_name, details in strategy_grid.items():
+        param_grid = details['params']
+        if not param_grid or not any(param_grid.values()):
+            continue
+        func = details['func']
+        combos = list(_valid_combos(strat_name, param_grid))
+        if exits:
+            func = WithExits(func)
+            combos = [{**params, **exit_params} for params in combos for exit_params in _valid_combos('exits', exits)]
+        plan.append((strat_name, func, combos))
+
+    total = sum(len(combos) for _, _, combos in plan)
+    completed = 0
+    heaps = {}
+
+    def keep(strat_name, results):
+        results = [(params, stats) for params, stats in results if stats['trades'] > 0]
+        if keep_top:
+            heap = heaps.setdefault(strat_name, TopK(keep_top, ranking_metric))
+            for params, stats in results:
+                heap.push(params, stats)
+        elif results:
+            all_results[strat_name].extend(results)
+
+    if not vectorized:
+        for strat_name, func, combos in plan:
+            print(f"Testing {strat_name} strategy...")
+            for params in combos:
+                try:
+                    signals = func(df, **params, cache=cache)
+                    stats = backtest(df, signals, initial_capital, include_curve=False)
+                    keep(strat_name, [(params, stats)])
+                except Exception as e:
+                    print(f"[ERROR] {strat_name} {params} failed: {e}")
+
+                completed += 1
+                progress(completed, total)
+    else:
+        if search_mode == 'halving':
+            options = halving_options(halving)
+            n_rungs = len(halving_rungs(len(df), **options))
+            tasks = [(strat_name, func, combos, initial_capital, ranking_metric, options)
+                     for strat_name, func, combos in plan if combos]
+            costs = [halving_evaluations(len(task[2]), n_rungs, options['eta']) for task in tasks]
+            task_fn = _halving_task
+            print(f"Successive halving over {n_rungs} rungs: {sum(costs)} evaluations instead of {total}")
+        else:
+            cached = {}
+            tasks = []
+            for strat_name, func, combos in plan:
+                if result_store is not None:
+                    cached[strat_name] = result_store.get_many(strat_name, combos)
+                    combos = [p for p in combos if params_key(p) not in cached[strat_name]]
+                for start in range(0, len(combos), chunk_size):
+                    # Zero-trade combos are scored too when caching, so they are not re-run next time
+                    tasks.append((strat_name, func, combos[start:start + chunk_size], initial_capital,
+                                  0 if result_store is not None else 1))
+            costs = [len(task[2]) for task in tasks]
+            task_fn = _evaluate_task
+            if result_store is not None:
+                print(f"Result cache: {sum(map(len, cached.values()))} of {total} combos already scored")
+
+        total = sum(costs)
+
+        def advance(count):
+            nonlocal completed
+            completed += count
+            progress(completed, total)
+
+        def collect(i, results):
+            if not results:
+                return
+            if result_store is not None and search_mode != 'halving':
+                result_store.put_many(tasks[i][0], results)
+            keep(tasks[i][0], results)
+
+        if workers > 1:
+            print(f"Running {len(tasks)} tasks on {workers} worker processes")
+            run_parallel(df, task_fn, tasks, workers,
+                         on_result=lambda i, results: (collect(i, results), advance(costs[i])))
+        elif search_mode == 'halving':
+            for i, task in enumerate(tasks):
+                strat_name, func, combos, _, _, options = task
+                collect(i, successive_halving(df, strat_name, func, combos, initial_capital, cache,
+                                              ranking_metric, progress=advance, **options))
+        else:
+            for i, task in enumerate(tasks):
+                collect(i, task_fn(df, task, cache))
+                advance(costs[i])
+
+        if result_store is not None and search_mode != 'halving':
+            for strat_name, func, combos in plan:
+                hits = cached[strat_name]
+                if not hits:
+                    continue
+                if keep_top:
+                    keep(strat_name, [(params, hits[params_key(params)]) for params in combos
+                                      if params_key(params) in hits])
+                    continue
+                # Merge cached and new results back into grid order
+                found = {params_key(params): stats for params, stats in all_results.pop(strat_name, [])}
+                found.update(hits)
+                results = [(params, found[params_key(params)]) for params in combos if params_key(params) in found]
+                keep(strat_name, results)
+
+    for strat_name, heap in heaps.items():
+        all_results[strat_name] = heap.items()
+
+    cache_stats = cache.stats()
+    print(f"Indicator cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+          f"{cache_stats['evictions']} evictions")
+    if cache_stats['duplicate_signals']:
+        print(f"Signal dedup: {cache_stats['duplicate_signals']} backtests skipped for repeated signals")
+    print(f"Peak RSS: {peak_rss_mb()} MB")
+
+    funcs = {strat_name: func for strat_name, func, _ in plan}
+    best_results = select_best(df, all_results, funcs, ranking_metric, initial_capital, cache, result_store)
+
     return best_results, all_results
 
 
 
 # --- Data Fetching ---
 
-def fetch_data(asset_type, symbol, interval='daily', db_path='../db/market_data.db'):
+def fetch_data(asset_type, symbol, interval='daily', db_path=None):
     """Fetch market data from database"""
     try:
-        conn = sqlite3.connect(db_path)
-        df = pd.read_sql_query(
-            f"SELECT * FROM candles WHERE type='{asset_type}' AND symbol='{symbol}' AND interval='{interval}' ORDER BY timestamp",
-            conn,
-            parse_dates=['timestamp']
-        )
-        conn.close()
-        
+        df = load_candles(symbol, asset_type, interval, db_path=db_path)
         if df.empty:
             raise ValueError(f"No data found for {symbol} with interval {interval}")
-        
-        df.set_index('timestamp', inplace=True)
-        return df[['open', 'high', 'low', 'close', 'volume']]
-    
+        return df
+
     except Exception as e:
         print(f"Error fetching data: {e}")
         return None
@@ -478,19 +964,71 @@ def analyze_results(results, top_n=10):
               f"{stats['sharpe']:<8.3f} {stats['sortino']:<8.3f} "
               f"{stats['max_drawdown']*100:<8.2f} {int(stats['trades']):<8}")
 
-def autotest(initial_capital, ranking_metric, asset_type, symbol, interval, start_date, end_date):
-    df = fetch_data(asset_type, symbol, interval, "app/db/market_data.db")
-    if df is None or df.empty:
-        return {"status": "error", "message": "Failed to fetch data or no data available."}
-
-    df.index = pd.to_datetime(df.index)
-    df = df.loc[(df.index.date >= start_date) & (df.index.date <= end_date)]
+def _summary_stats(stats, initial_capital):
+    """Rounded metrics as returned by the API"""
+    return {
+        "pnl": round(stats['pnl'], 2),
+        "pnl_percent": round((stats['pnl'] / initial_capital) * 100, 2),
+        "annual_return": round(stats['annual_return'], 4),
+        "sharpe_ratio": round(stats['sharpe'], 4),
+        "sortino_ratio": round(stats['sortino'], 4),
+        "calmar_ratio": round(stats['calmar'], 4),
+        "max_drawdown": round(stats['max_drawdown'], 4),
+        "win_rate": round(stats['win_rate'], 4),
+        "volatility": round(stats['volatility'], 4),
+        "total_trades": int(stats['trades']),
+    }
 
+def load_range(asset_type, symbol, interval, start_date, end_date):
+    """Fetch candles for [start_date, end_date]; returns (df, None) or (None, error response)"""
+    df = load_candles(symbol, asset_type, interval, start_date, end_date)
     if df.empty:
-        return {"status": "error", "message": "No data in the selected date range."}
+        return None, {"status": "error", "message": "No data in the selected date range."}
+    return df, None
 
-    # best_results, all_results = grid_search(df, initial_capital, ranking_metric)
-    best_results, all_results = grid_search(df, initial_capital, ranking_metric)
+def autotest(initial_capital, ranking_metric, asset_type, symbol, interval, start_date, end_date, progress=None,
+             search_mode='exhaustive', optimizer_budget=200, optimizer_time_limit=None, use_cache=True,
+             keep_top=None, response_format='full', max_points=None, include_all_results=True,
+             include_trades=True, exits=None, robustness_paths=0, robustness_method='block', halving=None):
+    """
+    Grid search (or optimizer run) over one symbol's date range, formatted for the API.
+
+    `response_format='compact'` returns epoch-second timestamps, equity curves
+    and trade lists as {"t": [...], ...} arrays and all_results as one array
+    per parameter and metric. `max_points` downsamples equity curves with
+    LTTB; `include_all_results` / `include_trades` can drop those sections.
+    `exits` adds stop-loss / take-profit / trailing-stop grid dimensions (see EXIT_GRID).
+    `halving` overrides successive halving's eta / min_fraction / min_bars
+    when `search_mode='halving'`.
+    With `robustness_paths > 0` each top strategy gets Monte Carlo confidence
+    intervals from app.backtest.robustness ('block' bootstrap or trade 'shuffle').
+    """
+    df, error = load_range(asset_type, symbol, interval, start_date, end_date)
+    if error:
+        return error
+
+    # One indicator cache per autotest call, shared by every strategy/combo
+    cache = IndicatorCache()
+
+    # Results persist across calls for the same OHLCV slice (0.001 is backtest()'s transaction cost)
+    result_store = None
+    if use_cache:
+        result_store = get_result_store().bind(
+            data_fingerprint(df, ('open', 'high', 'low', 'close', 'volume')), initial_capital, 0.001,
+            ENGINE_VERSION, symbol, interval, df.index[0], df.index[-1],
+        )
+
+    if search_mode in ('random', 'tpe'):
+        # Imported here: the optimizer module builds on this one
+        from app.backtest.optimizer import optimize
+        best_results, all_results = optimize(df, initial_capital, ranking_metric, method=search_mode,
+                                             budget=optimizer_budget, time_limit=optimizer_time_limit,
+                                             cache=cache, progress=progress, result_store=result_store)
+    else:
+        best_results, all_results = grid_search(df, initial_capital, ranking_metric, cache=cache,
+                                                workers=default_workers(), progress=progress,
+                                                search_mode=search_mode, result_store=result_store,
+                                                keep_top=keep_top, exits=exits, halving=halving)
 
     # Sort best_results based on ranking_metric
     if ranking_metric == "max_drawdown":
@@ -501,46 +1039,39 @@ def autotest(initial_capital, ranking_metric, asset_type, symbol, interval, star
     if not best_results:
         return {"status": "error", "message": "No valid results found during grid search."}
 
+    compact = response_format == 'compact'
+
     top_results = []
     for strat, params, stats in best_results[:10]:
-        top_results.append({
+        summary_stats = _summary_stats(stats, initial_capital)
+        if compact:
+            summary_stats["equity_curve"] = compact_curve(stats['equity_curve'], max_points, df.index)
+        elif max_points:
+            kept = lttb(np.arange(len(stats['equity_curve'])), [v for _, v in stats['equity_curve']], max_points)
+            summary_stats["equity_curve"] = [stats['equity_curve'][i] for i in kept]
+        else:
+            summary_stats["equity_curve"] = stats['equity_curve']
+        if include_trades:
+            summary_stats["trades_list"] = compact_trades(stats['trades_list']) if compact else stats['trades_list']
+        entry = {
             "strategy": strat,
             "parameters": params,
-            "stats": {
-                "pnl": round(stats['pnl'], 2),
-                "pnl_percent": round((stats['pnl'] / initial_capital) * 100, 2),
-                "annual_return": round(stats['annual_return'], 4),
-                "sharpe_ratio": round(stats['sharpe'], 4),
-                "sortino_ratio": round(stats['sortino'], 4),
-                "calmar_ratio": round(stats['calmar'], 4),
-                "max_drawdown": round(stats['max_drawdown'], 4),
-                "win_rate": round(stats['win_rate'], 4),
-                "volatility": round(stats['volatility'], 4),
-                "total_trades": int(stats['trades']),
-                "equity_curve": stats['equity_curve'],
-                "trades_list": stats['trades_list']
-            },
-        })
-
-    full_param_results = {}
-    for strat, results in all_results.items():
-        full_param_results[strat] = []
-        for param_set, stats in results:
-            full_param_results[strat].append({
-                "parameters": param_set,
-                "stats": {
-                    "pnl": round(stats['pnl'], 2),
-                    "pnl_percent": round((stats['pnl'] / initial_capital) * 100, 2),
-                    "annual_return": round(stats['annual_return'], 4),
-                    "sharpe_ratio": round(stats['sharpe'], 4),
-                    "sortino_ratio": round(stats['sortino'], 4),
-                    "calmar_ratio": round(stats['calmar'], 4),
-                    "max_drawdown": round(stats['max_drawdown'], 4),
-                    "win_rate": round(stats['win_rate'], 4),
-                    "volatility": round(stats['volatility'], 4),
-                    "total_trades": int(stats['trades']),
-                }
-            })
+            "stats": summary_stats,
+        }
+        if robustness_paths:
+            # Imported here: the robustness module builds on this one
+            from app.backtest.robustness import strategy_robustness
+            entry["robustness"] = strategy_robustness(df, strat, params, initial_capital, cache,
+                                                      n_paths=robustness_paths, method=robustness_method)
+        top_results.append(entry)
+
+    full_param_results = None
+    if include_all_results:
+        full_param_results = {}
+        for strat, results in all_results.items():
+            entries = [{"parameters": param_set, "stats": _summary_stats(stats, initial_capital)}
+                       for param_set, stats in results]
+            full_param_results[strat] = columnar_results(entries) if compact else entries
 
     best_strategy = top_results[0]
 
@@ -553,6 +1084,10 @@ def autotest(initial_capital, ranking_metric, asset_type, symbol, interval, star
                 "data_points": len(df),
                 "from": str(df.index[0]),
                 "to": str(df.index[-1]),
+                "search_mode": search_mode,
+                "indicator_cache": cache.stats(),
+                "result_cache": result_store.store.stats() if result_store is not None else None,
+                "peak_rss_mb": peak_rss_mb(),
             },
             "top_strategies": top_results,
             "best_strategy": best_strategy,
@@ -577,7 +1112,7 @@ if __name__ == '__main__':
     print("=" * 50)
     
     # Fetch data
-    df = fetch_data(symbol, interval)
+    df = fetch_data('stock', symbol, interval)
     if df is None:
         exit(1)
     
@@ -0,0 +1,282 @@
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.engine import get_adaptive_strategy_grid, WithExits, EXIT_GRID, sanitize
+from app.data.candles import MARKET_DB_PATH, read_sql, from_epoch, to_epoch
+
+DEFAULT_STATE_DB = os.getenv("STRATEGY_STATE_DB", os.path.join(os.path.dirname(MARKET_DB_PATH), "strategy_state.db"))
+
+
+# --- Running Metric State ---
+
+def empty_state(initial_capital=10000, transaction_cost=0.001):
+    """
+    Running accumulators behind backtest()'s metrics: Welford mean/variance
+    of all and of negative strategy returns, equity and its peak, the worst
+    drawdown, win / non-zero counts, trade count and the last position.
+    """
+    return {
+        "initial_capital": initial_capital, "transaction_cost": transaction_cost,
+        "n": 0, "mean": 0.0, "m2": 0.0,
+        "down_n": 0, "down_mean": 0.0, "down_m2": 0.0,
+        "equity": float(initial_capital), "peak": None, "min_drawdown": 0.0,
+        "wins": 0, "nonzero": 0, "trades": 0, "held_bars": 0,
+        "position": None, "last_close": None, "last_timestamp": None,
+    }
+
+
+def _merge_moments(n, mean, m2, values):
+    """Chan et al. parallel update of (count, mean, M2) with a batch of values"""
+    k = len(values)
+    if k == 0:
+        return n, mean, m2
+    batch_mean = float(values.mean())
+    batch_m2 = float(((values - batch_mean) ** 2).sum())
+    total = n + k
+    delta = batch_mean - mean
+    return total, mean + delta * k / total, m2 + batch_m2 + delta ** 2 * n * k / total
+
+
+def advance_state(state, close, positions, timestamps):
+    """
+    Fold new bars into `state` in O(len(close)). `positions` are the lagged
+    strategy signals for those bars (as backtest() receives them).
+    """
+    close = np.asarray(close, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    if len(close) == 0:
+        return state
+
+    # The very first bar only sets the starting position and price
+    if state["position"] is None:
+        state["position"] = float(positions[0])
+        state["last_close"] = float(close[0])
+        state["held_bars"] += int(positions[0] > 0)
+        state["last_timestamp"] = timestamps[0]
+        close, positions, timestamps = close[1:], positions[1:], timestamps[1:]
+        if len(close) == 0:
+            return state
+
+    prev_close = np.r_[state["last_close"], close[:-1]]
+    prev_position = np.r_[state["position"], positions[:-1]]
+    changes = np.abs(positions - prev_position)
+    returns = positions * (close / prev_close - 1) - changes * state["transaction_cost"]
+
+    state["n"], state["mean"], state["m2"] = _merge_moments(state["n"], state["mean"], state["m2"], returns)
+    down = returns[returns < 0]
+    state["down_n"], state["down_mean"], state["down_m2"] = _merge_moments(
+        state["down_n"], state["down_mean"], state["down_m2"], down)
+
+    equity = state["equity"] * np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(equity if state["peak"] is None else np.r_[state["peak"], equity])[-len(equity):]
+    state["min_drawdown"] = float(min(state["min_drawdown"], ((equity - peak) / peak).min()))
+    state["equity"] = float(equity[-1])
+    state["peak"] = float(peak[-1])
+
+    state["wins"] += int((returns > 0).sum())
+    state["nonzero"] += int((returns != 0).sum())
+    state["trades"] += int(changes.sum())
+    state["held_bars"] += int((positions > 0).sum())
+    state["position"] = float(positions[-1])
+    state["last_close"] = float(close[-1])
+    state["last_timestamp"] = timestamps[-1]
+    return state
+
+
+def state_metrics(state):
+    """backtest()'s metrics (without curves) from a running state"""
+    initial_capital = state["initial_capital"]
+    if state["held_bars"] == 0:
+        # Mirrors backtest()'s early return for signals that never hold a position
+        return {key: 0 for key in ('pnl', 'sharpe', 'sortino', 'calmar', 'max_drawdown', 'win_rate',
+                                   'trades', 'annual_return', 'volatility')}
+
+    mean = state["mean"]
+    std = np.sqrt(state["m2"] / (state["n"] - 1)) if state["n"] > 1 else np.nan
+    down_std = np.sqrt(state["down_m2"] / (state["down_n"] - 1)) if state["down_n"] > 1 else np.nan
+    mdd = state["min_drawdown"]
+    annual_return = (1 + mean) ** 252 - 1
+
+    return {
+        'pnl': sanitize(state["equity"] - initial_capital),
+        'sharpe': sanitize(np.sqrt(252) * mean / std) if std else 0.0,
+        'sortino': sanitize(np.sqrt(252) * mean / down_std) if state["down_n"] and down_std else 0.0,
+        'calmar': sanitize(annual_return / abs(mdd)) if mdd else 0.0,
+        'max_drawdown': sanitize(mdd),
+        'win_rate': sanitize(state["wins"] / (state["nonzero"] + 1)),
+        'trades': int(state["trades"]),
+        'annual_return': sanitize(annual_return),
+        'volatility': sanitize(std * np.sqrt(252)),
+    }
+
+
+# --- Persistence ---
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tracked_strategies (
+            asset_type TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            params TEXT NOT NULL,
+            initial_capital REAL NOT NULL,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (asset_type, symbol, interval, strategy, params, initial_capital)
+        )
+    """)
+    return conn
+
+
+def _read_candles(asset_type, symbol, interval, after=None, tail=None):
+    """Candles after `after` (epoch seconds), preceded by up to `tail` earlier bars"""
+    base = "SELECT timestamp, open, high, low, close, volume FROM candles WHERE type = ? AND symbol = ? AND interval = ?"
+    args = (asset_type, symbol, interval)
+    if after is None:
+        df = read_sql(base + " ORDER BY timestamp", args)
+        n_history = 0
+    else:
+        history = read_sql(base + " AND timestamp <= ? ORDER BY timestamp DESC LIMIT ?", (*args, after, tail))[::-1]
+        new = read_sql(base + " AND timestamp > ? ORDER BY timestamp", (*args, after))
+        df = pd.concat([part for part in (history, new) if not part.empty] or [new], ignore_index=True)
+        n_history = len(history)
+
+    epochs = df['timestamp'].tolist()
+    df.index = from_epoch(df.pop('timestamp'))
+    return df, epochs, n_history
+
+
+def _timestamp_text(value):
+    return value if isinstance(value, str) else str(from_epoch(value))
+
+
+def _strategy_func(strat_name, params):
+    func = get_adaptive_strategy_grid(0)[strat_name]['func']
+    return WithExits(func) if any(key in params for key in EXIT_GRID) else func
+
+
+def _full_pass(asset_type, symbol, interval, strat_name, params, initial_capital, transaction_cost):
+    """State after running the strategy over the whole stored history (None without data)"""
+    df, timestamps, _ = _read_candles(asset_type, symbol, interval)
+    if df.empty:
+        return None
+    signals = _strategy_func(strat_name, params)(df, **params)
+    return advance_state(empty_state(initial_capital, transaction_cost), df['close'], signals, timestamps)
+
+
+def track_strategy(asset_type, symbol, interval, strat_name, params, initial_capital=10000,
+                   transaction_cost=0.001, db_path=DEFAULT_STATE_DB):
+    """Start tracking a (symbol, strategy, params) triple: one full pass, then incremental updates"""
+    state = _full_pass(asset_type, symbol, interval, strat_name, params, initial_capital, transaction_cost)
+    if state is None:
+        return {"status": "error", "message": f"No data found for {symbol} with interval {interval}"}
+
+    conn = _connect(db_path)
+    conn.execute("INSERT OR REPLACE INTO tracked_strategies VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                 (asset_type, symbol, interval, strat_name, json.dumps(params, sort_keys=True),
+                  initial_capital, json.dumps(state), time.time()))
+    conn.commit()
+    conn.close()
+    return {"status": "success", "stats": state_metrics(state), "last_timestamp": _timestamp_text(state["last_timestamp"])}
+
+
+def refresh_tracked(symbol, interval, warmup=1000, backfilled_from=None, db_path=DEFAULT_STATE_DB):
+    """
+    Fold candles newer than each tracked triple's last bar into its state.
+
+    Signals for the new bars come from re-running the strategy on the last
+    `warmup` stored bars plus the new ones, so the cost depends on the
+    number of new bars and the warm-up, not on the length of the history.
+    Strategies with state (latches, exit overlays) can start that window in
+    a different position than the full history had; when the window's signal
+    at the last stored bar disagrees with the saved position, the triple is
+    recomputed with a full pass instead. So are triples whose last bar is at
+    or after `backfilled_from` (epoch seconds of the oldest row just
+    inserted): those rows filled a gap inside history the state has already
+    folded in. Returns the number of triples updated.
+    """
+    if not os.path.exists(db_path):
+        return 0
+
+    conn = _connect(db_path)
+    rows = conn.execute("""
+        SELECT asset_type, strategy, params, initial_capital, state FROM tracked_strategies
+        WHERE symbol = ? AND interval = ?
+    """, (symbol, interval)).fetchall()
+
+    updated = 0
+    for asset_type, strat_name, params_json, initial_capital, state_json in rows:
+        state = json.loads(state_json)
+        if isinstance(state["last_timestamp"], str):
+            # States saved before the epoch-second candles schema hold the timestamp text
+            state["last_timestamp"] = int(to_epoch([state["last_timestamp"]])[0])
+        params = json.loads(params_json)
+        if backfilled_from is not None and backfilled_from <= state["last_timestamp"]:
+            print(f"{strat_name} {params} on {symbol} ({interval}): bars backfilled into tracked history, recomputing in full")
+            state = _full_pass(asset_type, symbol, interval, strat_name, params, initial_capital,
+                               state["transaction_cost"])
+        else:
+            df, timestamps, n_history = _read_candles(asset_type, symbol, interval, state["last_timestamp"], warmup)
+            if len(df) == n_history:
+                continue
+
+            signals = np.asarray(_strategy_func(strat_name, params)(df, **params), dtype=float)
+            if n_history and signals[n_history - 1] != state["position"]:
+                print(f"{strat_name} {params} on {symbol} ({interval}): warm-up window out of step, recomputing in full")
+                state = _full_pass(asset_type, symbol, interval, strat_name, params, initial_capital,
+                                   state["transaction_cost"])
+            else:
+                advance_state(state, df['close'].to_numpy()[n_history:], signals[n_history:], timestamps[n_history:])
+
+        conn.execute("""
+            UPDATE tracked_strategies SET state = ?, updated_at = ?
+            WHERE asset_type = ? AND symbol = ? AND interval = ? AND strategy = ? AND params = ? AND initial_capital = ?
+        """, (json.dumps(state), time.time(), asset_type, symbol, interval, strat_name, params_json, initial_capital))
+        updated += 1
+
+    conn.commit()
+    conn.close()
+    return updated
+
+
+def leaderboard(symbol=None, interval=None, ranking_metric='sharpe', db_path=DEFAULT_STATE_DB):
+    """Current stats of every tracked triple (optionally for one symbol/interval), best first"""
+    if not os.path.exists(db_path):
+        return []
+
+    conn = _connect(db_path)
+    query = "SELECT asset_type, symbol, interval, strategy, params, state FROM tracked_strategies"
+    clauses, args = [], []
+    if symbol is not None:
+        clauses.append("symbol = ?")
+        args.append(symbol)
+    if interval is not None:
+        clauses.append("interval = ?")
+        args.append(interval)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    rows = conn.execute(query, args).fetchall()
+    conn.close()
+
+    board = []
+    for asset_type, row_symbol, row_interval, strat_name, params_json, state_json in rows:
+        state = json.loads(state_json)
+        board.append({
+            "asset_type": asset_type,
+            "symbol": row_symbol,
+            "interval": row_interval,
+            "strategy": strat_name,
+            "parameters": json.loads(params_json),
+            "last_timestamp": _timestamp_text(state["last_timestamp"]),
+            "stats": state_metrics(state),
+        })
+    board.sort(key=lambda row: row["stats"][ranking_metric], reverse=True)
+    return board
@@ -0,0 +1,128 @@
+import hashlib
+import sys
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def data_fingerprint(df, columns=('open', 'high', 'low', 'close')):
+    """Stable hash of an OHLC frame (index + price columns)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes())
+    for col in columns:
+        if col in df.columns:
+            h.update(col.encode())
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value.values())
+    return 0
+
+
+class IndicatorCache:
+    """
+    Per-run LRU cache of indicator series keyed by (indicator, params, data fingerprint).
+
+    Values are shared between callers and must be treated as read-only.
+    Once the stored bytes exceed `max_bytes` the least recently used
+    entries are evicted.
+
+    The same LRU (and byte cap) also memoizes backtest stats per distinct
+    signal vector (see signal_key), so combos that produce the same
+    positions are only backtested once.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._fingerprints = {}  # id(frame) -> (weak reference, fingerprint)
+        self.duplicate_signals = 0
+
+    def fingerprint(self, df):
+        # The same frame object is passed to every combo of a run, so only hash it once.
+        # Weak references let halving prefixes and walk-forward slices be freed after use.
+        key = id(df)
+        cached = self._fingerprints.get(key)
+        if cached is not None and cached[0]() is df:
+            return cached[1]
+        fp = data_fingerprint(df)
+        fingerprints = self._fingerprints
+        self._fingerprints[key] = (weakref.ref(df, lambda _: fingerprints.pop(key, None)), fp)
+        return fp
+
+    def signal_key(self, df, signals, *extra):
+        """Key for a signal vector on this data (plus any backtest settings in `extra`)"""
+        digest = hashlib.blake2b(np.ascontiguousarray(signals).tobytes(), digest_size=16).hexdigest()
+        return (self.fingerprint(df), digest, *extra)
+
+    def get(self, name, params, df, compute):
+        """Return the cached indicator, computing and storing it on a miss"""
+        key = (name, tuple(params), self.fingerprint(df))
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        self.misses += 1
+        value = compute()
+        self._store(key, value)
+        return value
+
+    def signal_result(self, key):
+        """Memoized backtest stats for a signal_key(), or None"""
+        entry = self._entries.get(('signal', key))
+        if entry is None:
+            return None
+        self._entries.move_to_end(('signal', key))
+        return entry[0]
+
+    def store_signal_result(self, key, stats):
+        self._store(('signal', key), stats)
+
+    def _store(self, key, value):
+        size = _nbytes(value)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= previous[1]
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+        self._evict()
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the cap
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._fingerprints.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'duplicate_signals': self.duplicate_signals,
+        }
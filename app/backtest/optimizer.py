@@ -0,0 +1,249 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.backtest.engine import (
+    sma_crossover, ema_crossover, rsi_strategy, macd_strategy, bollinger_strategy,
+    stochastic_strategy, williams_r_strategy, momentum_strategy,
+    is_valid_combo, select_best, _evaluate_combos,
+)
+from app.backtest.indicator_cache import IndicatorCache
+
+
+# --- Search Space ---
+
+class IntRange:
+    """Inclusive integer range [low, high]"""
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng, size):
+        return rng.integers(self.low, self.high + 1, size=size)
+
+    def to_unit(self, values):
+        return (np.asarray(values, dtype=float) - self.low) / max(1, self.high - self.low)
+
+    def from_unit(self, u):
+        return np.clip(np.rint(self.low + u * (self.high - self.low)), self.low, self.high).astype(int)
+
+
+class FloatRange:
+    """Continuous range [low, high], optionally sampled on a log scale"""
+
+    def __init__(self, low, high, log=False):
+        self.low = low
+        self.high = high
+        self.log = log
+
+    def _bounds(self):
+        return (np.log(self.low), np.log(self.high)) if self.log else (self.low, self.high)
+
+    def sample(self, rng, size):
+        return self.from_unit(rng.random(size))
+
+    def to_unit(self, values):
+        lo, hi = self._bounds()
+        values = np.asarray(values, dtype=float)
+        return ((np.log(values) if self.log else values) - lo) / (hi - lo)
+
+    def from_unit(self, u):
+        lo, hi = self._bounds()
+        x = lo + np.clip(u, 0, 1) * (hi - lo)
+        return np.exp(x) if self.log else x
+
+
+def get_strategy_search_space():
+    """Continuous/integer ranges for every strategy (the optimizer's counterpart of get_adaptive_strategy_grid)"""
+    return {
+        'SMA': {'func': sma_crossover, 'params': {
+            'short': IntRange(2, 50),
+            'long': IntRange(20, 250)
+        }},
+        'EMA': {'func': ema_crossover, 'params': {
+            'short': IntRange(2, 50),
+            'long': IntRange(15, 250)
+        }},
+        'RSI': {'func': rsi_strategy, 'params': {
+            'low': FloatRange(5, 45),
+            'high': FloatRange(55, 95),
+            'length': IntRange(3, 40)
+        }},
+        'MACD': {'func': macd_strategy, 'params': {
+            'fast': IntRange(3, 20),
+            'slow': IntRange(10, 50),
+            'signal_period': IntRange(2, 15)
+        }},
+        'Bollinger': {'func': bollinger_strategy, 'params': {
+            'window': IntRange(5, 50),
+            'stddev': FloatRange(1.0, 3.5)
+        }},
+        'Stochastic': {'func': stochastic_strategy, 'params': {
+            'k_period': IntRange(3, 30),
+            'd_period': IntRange(2, 10),
+            'oversold': FloatRange(5, 40),
+            'overbought': FloatRange(60, 95)
+        }},
+        'Williams_R': {'func': williams_r_strategy, 'params': {
+            'period': IntRange(5, 40),
+            'oversold': FloatRange(-95, -60),
+            'overbought': FloatRange(-40, -5)
+        }},
+        'Momentum': {'func': momentum_strategy, 'params': {
+            'period': IntRange(2, 60),
+            'threshold': FloatRange(-1, 1)
+        }},
+    }
+
+
+def _to_python(value):
+    # Keep params JSON-friendly and comparable with grid_search output
+    if isinstance(value, np.integer):
+        return int(value)
+    return round(float(value), 4)
+
+
+def _sample_params(space, rng, size):
+    """Draw `size` random parameter dicts from a strategy's search space"""
+    columns = {name: dim.sample(rng, size) for name, dim in space.items()}
+    return [{name: _to_python(columns[name][i]) for name in space} for i in range(size)]
+
+
+# --- Samplers ---
+
+def _tpe_propose(space, history, rng, size, gamma=0.25, n_candidates=64):
+    """
+    Tree-structured Parzen Estimator step.
+
+    Splits the scored history into the best `gamma` fraction and the rest,
+    fits an independent Gaussian KDE per parameter (in unit space) to each
+    group, draws candidates from the good density and returns the `size`
+    candidates with the highest l(x) / g(x) ratio.
+    """
+    scores = np.array([score for _, score in history])
+    order = np.argsort(-scores, kind='stable')
+    n_good = max(1, int(np.ceil(gamma * len(history))))
+    good = [history[i][0] for i in order[:n_good]]
+    bad = [history[i][0] for i in order[n_good:]] or good
+
+    log_ratio = np.zeros(n_candidates * size)
+    candidates = {}
+    for name, dim in space.items():
+        good_u = dim.to_unit([p[name] for p in good])
+        bad_u = dim.to_unit([p[name] for p in bad])
+        bw_good = max(0.05, 1.06 * (good_u.std() or 0.2) * len(good_u) ** -0.2)
+        bw_bad = max(0.05, 1.06 * (bad_u.std() or 0.2) * len(bad_u) ** -0.2)
+
+        # Sample around randomly chosen good points
+        centers = good_u[rng.integers(0, len(good_u), size=n_candidates * size)]
+        u = np.clip(centers + rng.normal(0, bw_good, size=centers.shape), 0, 1)
+
+        def density(points, bw):
+            z = (u[:, None] - points[None, :]) / bw
+            return np.exp(-0.5 * z ** 2).mean(axis=1) / bw + 1e-12
+
+        log_ratio += np.log(density(good_u, bw_good)) - np.log(density(bad_u, bw_bad))
+        candidates[name] = dim.from_unit(u)
+
+    best = np.argsort(-log_ratio, kind='stable')
+    return [{name: _to_python(candidates[name][i]) for name in space} for i in best]
+
+
+# --- Optimizer ---
+
+def optimize_strategy(df, strat_name, func, space, initial_capital=10000, ranking_metric='sharpe',
+                      method='tpe', budget=200, batch_size=32, n_startup=64, seed=0, deadline=None,
+                      cache=None, progress=None):
+    """
+    Search one strategy's parameter space under a fixed evaluation budget.
+
+    `method` is 'random' (seeded uniform sampling) or 'tpe' (random start-up
+    batch, then Parzen-estimator proposals). Candidates are scored in batches
+    through backtest_matrix(); evaluation stops early once `deadline`
+    (a time.monotonic() value) passes. Returns (params, stats) pairs for
+    combos that traded, like grid_search's all_results entries.
+    """
+    rng = np.random.default_rng(seed)
+    seen = set()
+    history = []
+    results = []
+    evaluated = 0
+
+    while evaluated < budget:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+        size = min(batch_size, budget - evaluated)
+        if method == 'tpe' and len(history) >= min(n_startup, budget):
+            pool = _tpe_propose(space, history, rng, size)
+        else:
+            pool = _sample_params(space, rng, size * 4)
+
+        batch = []
+        for params in pool:
+            key = tuple(sorted(params.items()))
+            if key in seen or not is_valid_combo(strat_name, params):
+                continue
+            seen.add(key)
+            batch.append(params)
+            if len(batch) == size:
+                break
+        if not batch:
+            break
+
+        scored = _evaluate_combos(df, strat_name, func, batch, initial_capital, cache, min_trades=0)
+        for params, stats in scored:
+            # Combos that never trade are recorded as the worst possible outcome
+            score = stats[ranking_metric] if stats['trades'] > 0 else -np.inf
+            history.append((params, score if np.isfinite(score) else -1e9))
+            if stats['trades'] > 0:
+                results.append((params, stats))
+
+        evaluated += len(batch)
+        if progress is not None:
+            progress(len(batch))
+
+    return results
+
+
+def optimize(df, initial_capital=10000, ranking_metric='sharpe', method='tpe', budget=200,
+             time_limit=None, seed=0, cache=None, progress=None, result_store=None):
+    """
+    Budgeted alternative to grid_search() over get_strategy_search_space().
+
+    `budget` is the number of evaluations per strategy and `time_limit`
+    (seconds) caps the whole run, split evenly across strategies. Returns
+    (best_results, all_results) in the same format as grid_search().
+    `result_store` caches the winners' equity curves.
+    """
+    space = get_strategy_search_space()
+    if cache is None:
+        cache = IndicatorCache()
+
+    total = budget * len(space)
+    completed = 0
+
+    def advance(count):
+        nonlocal completed
+        completed += count
+        if progress is not None:
+            progress(completed, total)
+
+    print(f"Optimizing {len(space)} strategies with {method} search ({budget} evaluations each)")
+
+    start = time.monotonic()
+    all_results = defaultdict(list)
+    for i, (strat_name, details) in enumerate(space.items()):
+        deadline = None if time_limit is None else start + time_limit * (i + 1) / len(space)
+        results = optimize_strategy(
+            df, strat_name, details['func'], details['params'], initial_capital, ranking_metric,
+            method=method, budget=budget, seed=seed + i, deadline=deadline, cache=cache, progress=advance,
+        )
+        if results:
+            all_results[strat_name].extend(results)
+
+    funcs = {strat_name: details['func'] for strat_name, details in space.items()}
+    best_results = select_best(df, all_results, funcs, ranking_metric, initial_capital, cache, result_store)
+    return best_results, all_results
@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from app.backtest.indicator_cache import IndicatorCache
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Per-process state, set once by _init_worker
+_worker_shm = None
+_worker_df = None
+_worker_cache = None
+
+
+def default_workers():
+    """Worker count from the BACKTEST_WORKERS env var (defaults to 1, i.e. serial)"""
+    value = os.getenv("BACKTEST_WORKERS", "1")
+    if value.lower() == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+def publish_ohlcv(df):
+    """
+    Copy the OHLCV columns and the timestamp index into one shared-memory block.
+
+    Returns the SharedMemory handle (the caller must close and unlink it) and
+    a small picklable spec that workers use to attach to the same pages.
+    """
+    n = len(df)
+    index = pd.DatetimeIndex(df.index)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * 8 * (1 + len(OHLCV_COLUMNS))))
+
+    stamps = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    stamps[:] = index.asi8
+    values = np.ndarray((n, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    values[:] = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+
+    spec = {'name': shm.name, 'rows': n, 'tz': str(index.tz) if index.tz else None, 'index_name': index.name}
+    return shm, spec
+
+
+def attach_ohlcv(spec):
+    """Rebuild a read-only OHLCV DataFrame on top of a published shared-memory block"""
+    # Pool workers share the parent's resource tracker, so the parent's unlink covers them
+    shm = shared_memory.SharedMemory(name=spec['name'])
+
+    n = spec['rows']
+    stamps = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    values = np.ndarray((n, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    values.flags.writeable = False
+
+    index = pd.DatetimeIndex(stamps.view('datetime64[ns]'), name=spec['index_name'])
+    if spec['tz']:
+        index = index.tz_localize('UTC').tz_convert(spec['tz'])
+
+    df = pd.DataFrame(values, index=index, columns=OHLCV_COLUMNS, copy=False)
+    return shm, df
+
+
+def _init_worker(spec):
+    global _worker_shm, _worker_df, _worker_cache
+    _worker_shm, _worker_df = attach_ohlcv(spec)
+    _worker_cache = IndicatorCache()
+
+
+def _run_task(args):
+    task_fn, task = args
+    return task_fn(_worker_df, task, _worker_cache)
+
+
+def run_parallel(df, task_fn, tasks, workers, on_result=None):
+    """
+    Run `task_fn(df, task, cache)` for every task across a process pool.
+
+    The OHLCV frame is published once through shared memory instead of being
+    pickled per task; each worker keeps its own IndicatorCache. Results are
+    returned in task order, and `on_result(i, result)` is called as each one
+    arrives. If the callback raises, queued tasks are cancelled.
+    """
+    shm, spec = publish_ohlcv(df)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,))
+    try:
+        results = []
+        for result in pool.map(_run_task, [(task_fn, task) for task in tasks]):
+            results.append(result)
+            if on_result is not None:
+                on_result(len(results) - 1, result)
+        return results
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        shm.close()
+        shm.unlink()
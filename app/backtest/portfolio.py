@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from app.backtest.batch import fetch_data_bulk
+from app.backtest.engine import get_adaptive_strategy_grid, returns_metrics, sanitize, METRIC_KEYS
+
+
+# --- Panel Data ---
+
+def load_panel(asset_type, symbols, interval, start_date, end_date):
+    """
+    Candles for several symbols from the `candles` table, aligned on the union
+    of their timestamps. Returns ({symbol: OHLCV df}, close panel df) where
+    the panel is forward-filled and NaN before a symbol's first bar.
+    """
+    frames = fetch_data_bulk(asset_type, symbols, [interval], start_date, end_date)
+    frames = {symbol: frames[(symbol, interval)] for symbol in symbols if (symbol, interval) in frames}
+    if not frames:
+        return {}, pd.DataFrame()
+
+    close = pd.concat({symbol: df['close'] for symbol, df in frames.items()}, axis=1).sort_index().ffill()
+    return frames, close
+
+
+def panel_signals(frames, close, strategy=None, params=None):
+    """
+    (bars x symbols) position matrix from running one engine strategy on every
+    symbol, aligned to `close`. With no strategy every listed symbol is held.
+    """
+    listed = close.notna().to_numpy()
+    if strategy is None:
+        return listed.astype(float)
+
+    grid = get_adaptive_strategy_grid(len(close))
+    if strategy not in grid:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    func = grid[strategy]['func']
+    columns = {symbol: func(df, **(params or {})) for symbol, df in frames.items()}
+    signals = pd.concat(columns, axis=1).reindex(close.index).ffill().fillna(0)
+    return signals[close.columns].to_numpy(dtype=float) * listed
+
+
+# --- Weights and Rebalancing ---
+
+def target_weights(returns, signals, method='equal', vol_window=20):
+    """
+    Target weights (bars x symbols) over the symbols with a position.
+    'equal' splits capital evenly; 'inverse_vol' weights by 1 / trailing
+    volatility of returns (known at the previous bar).
+    """
+    active = signals > 0
+    if method == 'equal':
+        raw = np.ones_like(returns)
+    elif method == 'inverse_vol':
+        vol = pd.DataFrame(returns).rolling(vol_window).std().shift(1).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raw = np.where(vol > 0, 1 / vol, np.nan)
+            # Symbols without a volatility estimate yet get the bar's average inverse vol
+            row_mean = np.nanmean(np.where(active, raw, np.nan), axis=1, keepdims=True)
+        raw = np.where(np.isnan(raw), np.nan_to_num(row_mean, nan=1.0), raw)
+    else:
+        raise ValueError(f"Unsupported weighting: {method}")
+
+    raw = np.where(active, raw, 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    return np.divide(raw, total, out=np.zeros_like(raw), where=total > 0)
+
+
+def rebalance_bars(index, rebalance='monthly'):
+    """
+    Boolean mask of scheduled rebalance bars: None (never), 'daily', 'weekly',
+    'monthly', 'quarterly' or an integer bar count. Bar 0 is always included.
+    """
+    n = len(index)
+    if rebalance is None or rebalance == 'none':
+        mask = np.zeros(n, dtype=bool)
+    elif rebalance == 'daily':
+        mask = np.ones(n, dtype=bool)
+    elif isinstance(rebalance, int):
+        mask = np.arange(n) % max(1, rebalance) == 0
+    else:
+        freq = {'weekly': 'W', 'monthly': 'M', 'quarterly': 'Q'}[rebalance]
+        periods = pd.DatetimeIndex(index).to_period(freq).asi8
+        mask = np.r_[True, periods[1:] != periods[:-1]]
+    if n:
+        mask[0] = True
+    return mask
+
+
+# --- Simulation ---
+
+def portfolio_backtest(close, signals, initial_capital=10000, weighting='equal', rebalance='monthly',
+                       transaction_cost=0.001, vol_window=20, index=None):
+    """
+    Vectorized multi-symbol backtest.
+
+    `close` is a (bars x symbols) price array and `signals` a matching position
+    matrix (1 = hold, 0 = flat), lagged like the engine's strategy signals.
+    Weights are reset to target on scheduled rebalance bars and whenever the
+    set of held symbols changes; in between, holdings drift with prices.
+    Turnover is charged `transaction_cost`. Returns backtest()-style stats
+    plus the per-bar portfolio returns and weights.
+    """
+    close = np.asarray(close, dtype=float)
+    signals = np.asarray(signals, dtype=float)
+    n, k = close.shape
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.nan_to_num(close[1:] / close[:-1] - 1, nan=0.0, posinf=0.0, neginf=0.0)
+    returns = np.vstack([np.zeros((1, k)), np.maximum(returns, -0.999999)])
+    signals = np.where(np.isnan(close), 0.0, signals)
+
+    # Segments start at every scheduled rebalance and every change in held symbols
+    held = signals > 0
+    changed = np.r_[True, (held[1:] != held[:-1]).any(axis=1)]
+    scheduled = rebalance_bars(index if index is not None else pd.RangeIndex(n), rebalance)
+    starts = scheduled | changed
+    segment = np.cumsum(starts) - 1
+    start_bar = np.flatnonzero(starts)
+
+    targets = target_weights(returns, signals, weighting, vol_window)[start_bar]  # one row per segment
+    cash = 1 - targets.sum(axis=1)
+
+    # Growth of each symbol since its segment began: exp(L[t] - L[start - 1])
+    log_growth = np.cumsum(np.log1p(returns), axis=0)
+    base = np.vstack([np.zeros((1, k)), log_growth])[start_bar]
+    growth = np.exp(log_growth - base[segment])
+
+    holdings = targets[segment] * growth
+    value = holdings.sum(axis=1) + cash[segment]
+    prev_value = np.r_[1.0, value[:-1]]
+    prev_value[starts] = 1.0
+    port_returns = value / prev_value - 1
+
+    # Turnover at each segment start against the weights drifted to the previous bar
+    drifted = np.zeros((len(start_bar), k))
+    ends = start_bar[1:] - 1
+    drifted[1:] = holdings[ends] / value[ends, None]
+    turnover = np.abs(targets - drifted).sum(axis=1)
+    port_returns[start_bar] -= turnover * transaction_cost
+    port_returns[0] = 0.0
+
+    weights = holdings / value[:, None]
+    metrics = returns_metrics(port_returns[1:], initial_capital)
+    stats = {key: float(metrics[key][0]) for key in METRIC_KEYS if key != 'trades'}
+    stats['trades'] = int(np.abs(np.diff(held.astype(int), axis=0)).sum())
+    stats['rebalances'] = int(starts.sum())
+    stats['turnover'] = sanitize(turnover.sum())
+
+    return {
+        'stats': stats,
+        'returns': port_returns,
+        'weights': weights,
+        'equity': np.cumprod(1 + port_returns) * initial_capital,
+    }
+
+
+def portfolio_test(initial_capital, asset_type, symbols, interval, start_date, end_date, strategy=None,
+                   params=None, weighting='equal', rebalance='monthly', transaction_cost=0.001):
+    frames, close = load_panel(asset_type, symbols, interval, start_date, end_date)
+    if close.empty:
+        return {"status": "error", "message": "No data in the selected date range."}
+
+    try:
+        signals = panel_signals(frames, close, strategy, params)
+        result = portfolio_backtest(close.to_numpy(), signals, initial_capital, weighting, rebalance,
+                                    transaction_cost, index=close.index)
+    except (KeyError, ValueError, TypeError) as e:
+        return {"status": "error", "message": str(e)}
+
+    return {
+        "status": "success",
+        "data": {
+            "summary": {
+                "symbols": list(close.columns),
+                "missing_symbols": [symbol for symbol in symbols if symbol not in frames],
+                "interval": interval,
+                "data_points": len(close),
+                "from": str(close.index[0]),
+                "to": str(close.index[-1]),
+                "strategy": strategy,
+                "weighting": weighting,
+                "rebalance": rebalance,
+            },
+            "stats": result['stats'],
+            "final_weights": {symbol: sanitize(w) for symbol, w in zip(close.columns, result['weights'][-1])},
+            "equity_curve": [[str(date), sanitize(value)] for date, value in zip(close.index, result['equity'])],
+        }
+    }
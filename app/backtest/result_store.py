@@ -0,0 +1,224 @@
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+
+from app.data.candles import MARKET_DB_PATH
+
+# Next to the market database unless configured, so it does not depend on the working directory
+DEFAULT_DB_PATH = os.getenv("BACKTEST_CACHE_DB", os.path.join(os.path.dirname(MARKET_DB_PATH), "backtest_cache.db"))
+DEFAULT_MAX_BYTES = int(os.getenv("BACKTEST_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+class ResultStore:
+    """
+    Persistent cache of backtest results in SQLite.
+
+    Rows are keyed by (data hash, strategy, params, initial capital,
+    transaction cost, engine version) and hold the metrics as JSON plus an
+    optional zlib-compressed equity curve / trade list. When the stored
+    bytes exceed `max_bytes`, the least recently read rows are evicted; the
+    total is counted once and then kept up to date as rows are written, so
+    writes only rescan the table when eviction is actually due.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = None  # running estimate of SUM(size); None until first counted
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backtest_results (
+                    data_hash TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    initial_capital REAL NOT NULL,
+                    transaction_cost REAL NOT NULL,
+                    engine_version TEXT NOT NULL,
+                    symbol TEXT,
+                    interval TEXT,
+                    range_start TEXT,
+                    range_end TEXT,
+                    metrics TEXT NOT NULL,
+                    curve BLOB,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (data_hash, strategy, params, initial_capital, transaction_cost, engine_version)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_backtest_results_range
+                ON backtest_results (symbol, interval, range_start, range_end)
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def bind(self, data_hash, initial_capital, transaction_cost, engine_version, symbol=None, interval=None,
+             range_start=None, range_end=None):
+        """Scope the store to one data slice and backtest configuration"""
+        return BoundResultStore(self, data_hash, initial_capital, transaction_cost, engine_version,
+                                symbol, interval, range_start, range_end)
+
+    def invalidate_range(self, symbol, interval, start, end):
+        """Drop cached results whose data range overlaps newly written candles [start, end]"""
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                DELETE FROM backtest_results
+                WHERE symbol = ? AND interval = ? AND range_start <= ? AND range_end >= ?
+            """, (symbol, interval, str(end), str(start)))
+            return cursor.rowcount
+
+    def evict(self):
+        """Delete least recently used rows until the store is back under 90% of max_bytes"""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM backtest_results").fetchone()[0]
+            self._bytes = total
+            if total <= self.max_bytes:
+                return 0
+
+            target = total - int(self.max_bytes * 0.9)
+            removed = 0
+            freed = 0
+            rows = conn.execute("SELECT rowid, size FROM backtest_results ORDER BY last_access")
+            doomed = []
+            for rowid, size in rows:
+                if freed >= target:
+                    break
+                doomed.append((rowid,))
+                freed += size
+                removed += 1
+            conn.executemany("DELETE FROM backtest_results WHERE rowid = ?", doomed)
+            self._bytes = total - freed
+            return removed
+
+    def _written(self, size):
+        """Account for `size` new bytes and evict once the running total passes max_bytes"""
+        if self._bytes is None:
+            with self._connect() as conn:
+                self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM backtest_results").fetchone()[0]
+        else:
+            # Replaced rows and other writers make this an estimate; evict() recounts exactly
+            self._bytes += size
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM backtest_results").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+class BoundResultStore:
+    def __init__(self, store, data_hash, initial_capital, transaction_cost, engine_version,
+                 symbol, interval, range_start, range_end):
+        self.store = store
+        self.key = (data_hash, float(initial_capital), float(transaction_cost), str(engine_version))
+        self.meta = (symbol, interval, None if range_start is None else str(range_start),
+                     None if range_end is None else str(range_end))
+
+    def get_many(self, strategy, params_list):
+        """Cached stats for the given combos as {params key: stats}; misses are absent"""
+        now = time.time()
+        found = {}
+        with self.store._connect() as conn:
+            rows = conn.execute("""
+                SELECT params, metrics FROM backtest_results
+                WHERE data_hash = ? AND initial_capital = ? AND transaction_cost = ? AND engine_version = ?
+                AND strategy = ?
+            """, (*self.key, strategy)).fetchall()
+            wanted = {params_key(params) for params in params_list}
+            for params, metrics in rows:
+                if params in wanted:
+                    found[params] = json.loads(metrics)
+            if found:
+                conn.executemany("""
+                    UPDATE backtest_results SET last_access = ?
+                    WHERE data_hash = ? AND initial_capital = ? AND transaction_cost = ? AND engine_version = ?
+                    AND strategy = ? AND params = ?
+                """, [(now, *self.key, strategy, params) for params in found])
+        self.store.hits += len(found)
+        self.store.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, strategy, results):
+        """Store metrics-only stats for (params, stats) pairs"""
+        now = time.time()
+        rows = []
+        for params, stats in results:
+            metrics = json.dumps({k: v for k, v in stats.items() if k not in ('equity_curve', 'trades_list')})
+            rows.append((self.key[0], strategy, params_key(params), *self.key[1:], *self.meta,
+                         metrics, None, len(metrics), now))
+        with self.store._connect() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO backtest_results
+                (data_hash, strategy, params, initial_capital, transaction_cost, engine_version,
+                 symbol, interval, range_start, range_end, metrics, curve, size, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        self.store._written(sum(row[-2] for row in rows))
+
+    def get_full(self, strategy, params):
+        """Full stats (with equity curve and trade list) if a curve was stored, else None"""
+        with self.store._connect() as conn:
+            row = conn.execute("""
+                SELECT metrics, curve FROM backtest_results
+                WHERE data_hash = ? AND initial_capital = ? AND transaction_cost = ? AND engine_version = ?
+                AND strategy = ? AND params = ?
+            """, (*self.key, strategy, params_key(params))).fetchone()
+        if row is None or row[1] is None:
+            return None
+        stats = json.loads(row[0])
+        stats.update(json.loads(zlib.decompress(row[1])))
+        return stats
+
+    def put_full(self, strategy, params, stats):
+        """Store stats together with the compressed equity curve and trade list"""
+        metrics = json.dumps({k: v for k, v in stats.items() if k not in ('equity_curve', 'trades_list')})
+        curve = zlib.compress(json.dumps({
+            'equity_curve': stats.get('equity_curve'),
+            'trades_list': stats.get('trades_list'),
+        }).encode())
+        with self.store._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO backtest_results
+                (data_hash, strategy, params, initial_capital, transaction_cost, engine_version,
+                 symbol, interval, range_start, range_end, metrics, curve, size, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (self.key[0], strategy, params_key(params), *self.key[1:], *self.meta,
+                  metrics, curve, len(metrics) + len(curve), time.time()))
+        self.store._written(len(metrics) + len(curve))
+
+
+_default_store = None
+
+
+def get_result_store():
+    """Process-wide ResultStore on the default database file"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResultStore()
+    return _default_store
+
+
+def invalidate_range(symbol, interval, start, end, db_path=DEFAULT_DB_PATH):
+    """Called by the candle writer: drop cached results overlapping [start, end]"""
+    if not os.path.exists(db_path):
+        return 0
+    return ResultStore(db_path).invalidate_range(symbol, interval, start, end)
@@ -0,0 +1,119 @@
+import numpy as np
+
+from app.backtest.engine import (
+    get_adaptive_strategy_grid, WithExits, EXIT_GRID, strategy_returns, returns_metrics, sanitize,
+)
+
+ROBUSTNESS_METRICS = ['pnl', 'sharpe', 'max_drawdown']
+
+# Bars x paths per batch (16 MB per float array); returns_metrics() makes a few temporaries of this size
+BATCH_ELEMENTS = 2_000_000
+
+
+# --- Path Generators ---
+
+def block_bootstrap(returns, n_paths, block_size=20, rng=None):
+    """
+    Moving-block bootstrap: (bars x n_paths) paths built from randomly
+    placed blocks of `block_size` consecutive returns, which keeps the
+    short-range autocorrelation of the strategy's returns.
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    returns = np.asarray(returns, dtype=float)
+    m = len(returns)
+    block_size = max(1, min(block_size, m))
+    n_blocks = -(-m // block_size)
+
+    starts = rng.integers(0, m - block_size + 1, size=(n_blocks, n_paths))
+    index = starts[:, None, :] + np.arange(block_size)[None, :, None]
+    return returns[index.reshape(n_blocks * block_size, n_paths)[:m]]
+
+
+def trade_shuffle(returns, positions, n_paths, rng=None):
+    """
+    Reorder whole runs of constant position (trades and the flat stretches
+    between them) independently per path. Final PnL is unchanged; the
+    drawdown and Sharpe spread show how much the result depends on the
+    order in which trades happened.
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    returns = np.asarray(returns, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    m = len(returns)
+
+    run = np.cumsum(np.r_[True, positions[1:] != positions[:-1]]) - 1
+    lengths = np.bincount(run)
+    offset = np.arange(m) - np.r_[0, np.cumsum(lengths)[:-1]][run]
+
+    # Rank of every run in each path's random order, then where its bars land
+    order = np.argsort(rng.random((len(lengths), n_paths)), axis=0)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(len(lengths))[:, None], axis=0)
+    run_start = np.cumsum(lengths[order], axis=0) - lengths[order]
+    new_start = np.take_along_axis(run_start, rank, axis=0)
+
+    paths = np.empty((m, n_paths))
+    rows = new_start[run] + offset[:, None]
+    np.put_along_axis(paths, rows, np.broadcast_to(returns[:, None], (m, n_paths)), axis=0)
+    return paths
+
+
+# --- Analysis ---
+
+def robustness(returns, initial_capital=10000, n_paths=10000, method='block', block_size=20, positions=None,
+               seed=0, batch_size=None, confidence=0.9):
+    """
+    Resample a strategy's per-bar returns into `n_paths` paths and score
+    them all with returns_metrics(), `batch_size` paths at a time (by
+    default as many as fit in BATCH_ELEMENTS, so memory stays flat however
+    long the series is).
+
+    Returns, per metric in ROBUSTNESS_METRICS, the mean and the central
+    `confidence` interval, plus the share of paths that lost money.
+    `method='shuffle'` needs the matching `positions`.
+    """
+    rng = np.random.default_rng(seed)
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) < 2:
+        return None
+    if batch_size is None:
+        batch_size = max(1, BATCH_ELEMENTS // len(returns))
+
+    samples = {key: [] for key in ROBUSTNESS_METRICS}
+    for start in range(0, n_paths, batch_size):
+        size = min(batch_size, n_paths - start)
+        if method == 'shuffle':
+            paths = trade_shuffle(returns, positions, size, rng)
+        elif method == 'block':
+            paths = block_bootstrap(returns, size, block_size, rng)
+        else:
+            raise ValueError(f"Unsupported resampling method: {method}")
+
+        metrics = returns_metrics(paths, initial_capital)
+        for key in ROBUSTNESS_METRICS:
+            samples[key].append(metrics[key])
+
+    tail = (1 - confidence) / 2 * 100
+    result = {"method": method, "paths": n_paths, "confidence": confidence}
+    for key in ROBUSTNESS_METRICS:
+        values = np.concatenate(samples[key])
+        low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+        result[key] = {
+            "mean": sanitize(values.mean()),
+            "median": sanitize(median),
+            "low": sanitize(low),
+            "high": sanitize(high),
+        }
+    result["prob_loss"] = float((np.concatenate(samples['pnl']) < 0).mean())
+    return result
+
+
+def strategy_robustness(df, strat_name, params, initial_capital=10000, cache=None, **options):
+    """robustness() for one grid/optimizer winner, regenerating its signal on `df`"""
+    func = get_adaptive_strategy_grid(len(df))[strat_name]['func']
+    if any(key in params for key in EXIT_GRID):
+        func = WithExits(func)
+    signal = np.asarray(func(df, **params, cache=cache), dtype=float)
+
+    returns, _ = strategy_returns(df['close'].to_numpy(dtype=float), signal)
+    return robustness(returns[:, 0], initial_capital, positions=signal[1:], **options)
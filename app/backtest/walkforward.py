@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.backtest.engine import (
+    get_adaptive_strategy_grid, backtest_matrix, strategy_returns, returns_metrics,
+    load_range, sanitize, _valid_combos, _matrix_stats, METRIC_KEYS,
+)
+from app.backtest.indicator_cache import IndicatorCache
+
+
+def walk_forward_windows(data_length, train_bars, test_bars, anchored=False):
+    """
+    (train_start, train_end, test_start, test_end) bar ranges.
+
+    Rolling windows slide a fixed-size train window forward by `test_bars`;
+    anchored windows keep the train start at bar 0 and grow.
+    """
+    if train_bars < 1 or test_bars < 1:
+        raise ValueError(f"train_bars and test_bars must be positive (got {train_bars} and {test_bars})")
+
+    windows = []
+    train_end = train_bars
+    while train_end < data_length:
+        test_end = min(train_end + test_bars, data_length)
+        train_start = 0 if anchored else train_end - train_bars
+        windows.append((train_start, train_end, train_end, test_end))
+        train_end = test_end
+    return windows
+
+
+def build_signal_bank(df, cache=None):
+    """
+    Generate every grid combo's signal once over the full series.
+
+    Indicators are causal, so slicing these full-series signals gives each
+    window the same positions it would see live, without recomputing any
+    indicator per window. Returns {strategy: (params_list, int8 bars x combos matrix)}.
+    """
+    if cache is None:
+        cache = IndicatorCache()
+
+    bank = {}
+    for strat_name, details in get_adaptive_strategy_grid(len(df)).items():
+        func = details['func']
+        params_list = []
+        columns = []
+        for params in _valid_combos(strat_name, details['params']):
+            try:
+                columns.append(np.asarray(func(df, **params, cache=cache), dtype=np.int8))
+                params_list.append(params)
+            except Exception as e:
+                print(f"[ERROR] {strat_name} {params} failed: {e}")
+        if columns:
+            bank[strat_name] = (params_list, np.column_stack(columns))
+    return bank
+
+
+def _run_window(bank, close, window, initial_capital, ranking_metric, transaction_cost, chunk_size=64):
+    """Pick the best combo on the train slice and score it on the following test slice"""
+    train_start, train_end, test_start, test_end = window
+
+    best = None  # (score, strategy, column, train metrics)
+    for strat_name, (params_list, signals) in bank.items():
+        for start in range(0, len(params_list), chunk_size):
+            metrics = backtest_matrix(close[train_start:train_end],
+                                      signals[train_start:train_end, start:start + chunk_size],
+                                      initial_capital, transaction_cost)
+            scores = np.where(metrics['trades'] > 0, metrics[ranking_metric], -np.inf)
+            j = int(np.argmax(scores))
+            if np.isfinite(scores[j]) and (best is None or scores[j] > best[0]):
+                best = (scores[j], strat_name, start + j, _matrix_stats(metrics, j))
+
+    if best is None:
+        return None, np.zeros(test_end - test_start)
+
+    _, strat_name, column, train_stats = best
+
+    # Include the last train bar so the first test bar gets its return and any entry cost
+    signal = bank[strat_name][1][test_start - 1:test_end, column]
+    returns, changes = strategy_returns(close[test_start - 1:test_end], signal, transaction_cost)
+    test_metrics = returns_metrics(returns, initial_capital)
+    test_metrics['trades'] = changes.sum(axis=0).astype(int)
+
+    return {
+        'strategy': strat_name,
+        'parameters': bank[strat_name][0][column],
+        'train_stats': train_stats,
+        'test_stats': _matrix_stats(test_metrics, 0),
+    }, returns[:, 0]
+
+
+def walk_forward(df, initial_capital=10000, ranking_metric='sharpe', train_bars=None, test_bars=None,
+                 anchored=False, workers=1, transaction_cost=0.001, cache=None):
+    """
+    Walk-forward optimization in a single pass over the data.
+
+    Each window optimizes the full strategy grid on its train slice and
+    trades the winner on the next test slice. Signals are built once on the
+    full series and shared by every window; windows run on `workers` threads.
+    Returns the per-window choices, the stitched out-of-sample equity curve
+    and its metrics.
+    """
+    if test_bars is None:
+        test_bars = max(1, len(df) // 8)
+    if train_bars is None:
+        train_bars = 3 * test_bars
+
+    windows = walk_forward_windows(len(df), train_bars, test_bars, anchored)
+    if not windows:
+        return None
+
+    print(f"Walk-forward: {len(windows)} {'anchored' if anchored else 'rolling'} windows "
+          f"({train_bars} train / {test_bars} test bars)")
+
+    bank = build_signal_bank(df, cache)
+    close = df['close'].to_numpy(dtype=float)
+
+    def run(window):
+        return _run_window(bank, close, window, initial_capital, ranking_metric, transaction_cost)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(run, windows))
+    else:
+        outputs = [run(window) for window in windows]
+
+    window_results = []
+    for (train_start, train_end, test_start, test_end), (choice, _) in zip(windows, outputs):
+        window_results.append({
+            'train': [str(df.index[train_start]), str(df.index[train_end - 1])],
+            'test': [str(df.index[test_start]), str(df.index[test_end - 1])],
+            **(choice or {'strategy': None, 'parameters': None, 'train_stats': None, 'test_stats': None}),
+        })
+
+    oos_returns = np.concatenate([returns for _, returns in outputs])
+    oos_metrics = returns_metrics(oos_returns, initial_capital)
+    oos_stats = {key: float(oos_metrics[key][0]) for key in METRIC_KEYS if key != 'trades'}
+    oos_stats['trades'] = int(sum(choice['test_stats']['trades'] for choice, _ in outputs if choice))
+
+    oos_index = df.index[windows[0][2]:windows[-1][3]]
+    equity = np.cumprod(1 + oos_returns) * initial_capital
+
+    return {
+        'windows': window_results,
+        'stats': oos_stats,
+        'equity_curve': [[str(date), sanitize(value)] for date, value in zip(oos_index, equity)],
+    }
+
+
+def walkforward_test(initial_capital, ranking_metric, asset_type, symbol, interval, start_date, end_date,
+                     train_bars=None, test_bars=None, anchored=False, workers=1):
+    df, error = load_range(asset_type, symbol, interval, start_date, end_date)
+    if error:
+        return error
+
+    try:
+        result = walk_forward(df, initial_capital, ranking_metric, train_bars, test_bars, anchored, workers)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    if result is None:
+        return {"status": "error", "message": "Not enough data for a single train/test window."}
+
+    return {
+        "status": "success",
+        "data": {
+            "summary": {
+                "symbol": symbol,
+                "interval": interval,
+                "data_points": len(df),
+                "from": str(df.index[0]),
+                "to": str(df.index[-1]),
+                "anchored": anchored,
+            },
+            **result,
+        }
+    }
@@ -0,0 +1,436 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
+# Single source of truth for the market data location (API, backtests and UI alike)
+MARKET_DB_PATH = os.getenv(
+    "MARKET_DB_PATH",
+    os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "db", "market_data.db")),
+)
+POOL_SIZE = int(os.getenv("MARKET_DB_POOL_SIZE", "4"))
+# Columnar copies of the default database's candles; set to "" to read SQLite only
+CANDLE_CACHE_DIR = os.getenv("CANDLE_CACHE_DIR", os.path.join(os.path.dirname(MARKET_DB_PATH), "columns"))
+
+CANDLE_FIELDS = ["open", "high", "low", "close", "volume"]
+
+# Bounds used when a range side is open, so every load runs the same SQL text
+MIN_EPOCH, MAX_EPOCH = -(2 ** 62), 2 ** 62
+
+
+# --- Schema ---
+
+# PRAGMA user_version of the current layout: 1 = integer epoch-second timestamps, clustered on the key
+SCHEMA_VERSION = 1
+
+CANDLES_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        symbol TEXT NOT NULL,
+        type TEXT,
+        interval TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume REAL,
+        PRIMARY KEY (symbol, interval, timestamp)
+    ) WITHOUT ROWID
+"""
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+def migrate_candles(conn):
+    """
+    Upgrade a version-0 candles table (TEXT timestamps, rowid table) in place:
+    timestamps become UTC epoch seconds and rows are stored clustered on
+    (symbol, interval, timestamp), so a range read is one contiguous b-tree scan.
+    Returns the number of rows migrated.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return 0
+
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")  # one migrator at a time; re-check the version under the lock
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            conn.execute("COMMIT")
+            return 0
+
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candles'").fetchone()
+        migrated = 0
+        if exists:
+            conn.execute(CANDLES_DDL.format(table="candles_v1"))
+            # Timestamps SQLite cannot parse (NULL epoch) are dropped by OR IGNORE
+            migrated = conn.execute("""
+                INSERT OR IGNORE INTO candles_v1
+                SELECT symbol, type, interval, CAST(strftime('%s', timestamp) AS INTEGER),
+                       open, high, low, close, volume
+                FROM candles
+            """).rowcount
+            conn.execute("DROP TABLE candles")
+            conn.execute("ALTER TABLE candles_v1 RENAME TO candles")
+        else:
+            conn.execute(CANDLES_DDL.format(table="candles"))
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if exists:
+        print(f"Migrated {migrated} candles to schema version {SCHEMA_VERSION}")
+    return migrated
+
+
+def ensure_schema(db_path=None):
+    """Create or migrate the candles table and switch the file to WAL; once per path per process"""
+    db_path = db_path or MARKET_DB_PATH
+    with _schema_lock:
+        if db_path in _schema_ready:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            # WAL is persistent in the file: readers no longer block the writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            migrate_candles(conn)
+        finally:
+            conn.close()
+        _schema_ready.add(db_path)
+
+
+def to_epoch(timestamps):
+    """Datetime-like values -> int64 UTC epoch seconds (naive values are taken as UTC)"""
+    values = pd.to_datetime(pd.Series(timestamps))
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+    return values.to_numpy(dtype="datetime64[ns]").astype("int64") // 1_000_000_000
+
+
+def from_epoch(seconds):
+    """Epoch seconds (scalar or array-like) -> naive UTC pandas datetimes"""
+    return pd.to_datetime(seconds, unit="s")
+
+
+# --- Connection Pool ---
+
+class ConnectionPool:
+    """
+    Thread-safe pool of read-only SQLite connections to one database file.
+    Connections are opened lazily up to `size`; callers beyond that wait for
+    one to be returned. Each connection keeps its own prepared-statement
+    cache, so reusing connections with constant SQL text skips re-parsing.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30, cached_statements=256)
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """Close idle connections; the pool reopens them on demand"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    """Pool for `db_path` (default MARKET_DB_PATH), one per process so forked workers never share connections"""
+    key = (os.getpid(), db_path or MARKET_DB_PATH)
+    with _pools_lock:
+        if key not in _pools:
+            # Read-only connections cannot migrate, so bring an existing file up to date first
+            if os.path.exists(key[1]):
+                ensure_schema(key[1])
+            _pools[key] = ConnectionPool(key[1])
+        return _pools[key]
+
+
+# --- Queries ---
+
+def read_sql(query, params=(), parse_dates=None, db_path=None):
+    """Run a parameterized SELECT on a pooled read-only connection and return a DataFrame"""
+    with get_pool(db_path).connection() as conn:
+        return pd.read_sql_query(query, conn, params=params, parse_dates=parse_dates)
+
+
+def epoch_bounds(start=None, end=None):
+    """Inclusive start / end dates -> half-open epoch-second range [lower, upper)"""
+    lower = MIN_EPOCH if start is None else int(pd.Timestamp(start).normalize().value // 1_000_000_000)
+    upper = MAX_EPOCH if end is None else int((pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).value // 1_000_000_000)
+    return lower, upper
+
+
+def load_candles(symbol, asset_type, interval, start=None, end=None, db_path=None):
+    """
+    OHLCV candles for one symbol, indexed by timestamp and sorted. `start` and
+    `end` are inclusive dates (either may be None). Reads the memory-mapped
+    column cache when there is one (building it on first use), otherwise runs
+    a primary-key range scan in SQLite. Returns an empty frame when the
+    database or the symbol has no data.
+    """
+    lower, upper = epoch_bounds(start, end)
+    if _use_cache(db_path):
+        df = _cached_frame(symbol, asset_type, interval, lower, upper)
+        if df is not None:
+            return df
+
+    try:
+        df = read_sql(
+            "SELECT timestamp, open, high, low, close, volume FROM candles "
+            "WHERE symbol = ? AND interval = ? AND timestamp >= ? AND timestamp < ? AND type = ? "
+            "ORDER BY timestamp",
+            (symbol, interval, lower, upper, asset_type),
+            db_path=db_path,
+        )
+    except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+        print(f"Error loading candles for {symbol} ({interval}): {e}")
+        return pd.DataFrame(columns=CANDLE_FIELDS, index=pd.DatetimeIndex([], name="timestamp"))
+
+    df.index = pd.DatetimeIndex(from_epoch(df.pop("timestamp")), name="timestamp")
+    return df[CANDLE_FIELDS]
+
+
+def latest_timestamp(symbol, interval, db_path=None):
+    """Newest stored timestamp for (symbol, interval), or None"""
+    result = read_sql(
+        "SELECT MAX(timestamp) AS latest FROM candles WHERE symbol = ? AND interval = ?",
+        (symbol, interval),
+        db_path=db_path,
+    )["latest"].iloc[0]
+    return from_epoch(result) if result is not None else None
+
+
+# --- Columnar Cache ---
+
+# One raw little-endian array file per column and a manifest per (symbol, interval).
+# Readers np.memmap the files, so every process shares the same page-cache pages.
+CACHE_COLUMNS = {"timestamp": "<i8", **{field: "<f8" for field in CANDLE_FIELDS}}
+
+
+def _use_cache(db_path):
+    return bool(CANDLE_CACHE_DIR) and (db_path is None or os.path.abspath(db_path) == os.path.abspath(MARKET_DB_PATH))
+
+
+def _cache_dir(symbol, interval):
+    return os.path.join(CANDLE_CACHE_DIR, quote(symbol, safe=""), quote(interval, safe=""))
+
+
+def _column_path(directory, generation, name):
+    return os.path.join(directory, f"{generation}.{name}.bin")
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_manifest(directory, manifest):
+    """Atomic swap, so readers see either the old or the new column set"""
+    path = os.path.join(directory, "manifest.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _export_columns(symbol, interval, after=MIN_EPOCH, db_path=None):
+    return read_sql(
+        "SELECT timestamp, type, open, high, low, close, volume FROM candles "
+        "WHERE symbol = ? AND interval = ? AND timestamp > ? ORDER BY timestamp",
+        (symbol, interval, after),
+        db_path=db_path,
+    )
+
+
+_cache_write_lock = threading.Lock()
+
+
+@contextmanager
+def _writer_lock(directory):
+    """Serialize cache writers for one (symbol, interval) across threads and processes"""
+    os.makedirs(directory, exist_ok=True)
+    with _cache_write_lock, open(os.path.join(directory, ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def rebuild_column_cache(symbol, interval, db_path=None):
+    """Write the full (symbol, interval) history from SQLite as a new cache generation; returns its manifest"""
+    directory = _cache_dir(symbol, interval)
+    with _writer_lock(directory):
+        return _rebuild_locked(directory, symbol, interval, db_path)
+
+
+def _rebuild_locked(directory, symbol, interval, db_path):
+    df = _export_columns(symbol, interval, db_path=db_path)
+    old = _read_manifest(directory)
+    if df.empty:
+        return None
+
+    # Unique per writer, so concurrent rebuilds never write into each other's files
+    generation = f"{time.time_ns()}-{os.getpid()}"
+    for name, dtype in CACHE_COLUMNS.items():
+        df[name].to_numpy(dtype=dtype).tofile(_column_path(directory, generation, name))
+    manifest = {
+        "generation": generation,
+        "rows": len(df),
+        "last": int(df["timestamp"].iloc[-1]),
+        "types": sorted(df["type"].dropna().unique().tolist()),
+    }
+    _write_manifest(directory, manifest)
+
+    # Open maps of the old files stay valid after unlink on POSIX
+    if old is not None:
+        for name in CACHE_COLUMNS:
+            try:
+                os.remove(_column_path(directory, old["generation"], name))
+            except OSError:
+                pass
+    return manifest
+
+
+def sync_column_cache(symbol, interval, db_path=None):
+    """
+    Bring an existing cache up to date after candles were written: bars after
+    the cached range are appended in place, anything inserted inside it
+    triggers a rebuild. Symbols without a cache are left to be built on first read.
+    """
+    if not _use_cache(db_path):
+        return
+    directory = _cache_dir(symbol, interval)
+    if _read_manifest(directory) is None:
+        return
+    with _writer_lock(directory):
+        _sync_locked(directory, symbol, interval, db_path)
+
+
+def _sync_locked(directory, symbol, interval, db_path):
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        return
+
+    cached_range_rows = read_sql(
+        "SELECT COUNT(*) AS n FROM candles WHERE symbol = ? AND interval = ? AND timestamp <= ?",
+        (symbol, interval, manifest["last"]),
+        db_path=db_path,
+    )["n"].iloc[0]
+    if cached_range_rows != manifest["rows"]:
+        _rebuild_locked(directory, symbol, interval, db_path)
+        return
+
+    df = _export_columns(symbol, interval, manifest["last"], db_path)
+    if df.empty:
+        return
+    types = sorted(set(manifest["types"]) | set(df["type"].dropna()))
+    # Files grow before the manifest does, so readers only ever map complete rows. Writing at
+    # rows * itemsize (not end-of-file) discards bytes left by an append that died before its manifest swap.
+    paths = {name: _column_path(directory, manifest["generation"], name) for name in CACHE_COLUMNS}
+    if any(os.path.getsize(path) < manifest["rows"] * np.dtype(CACHE_COLUMNS[name]).itemsize
+           for name, path in paths.items()):
+        _rebuild_locked(directory, symbol, interval, db_path)
+        return
+    for name, dtype in CACHE_COLUMNS.items():
+        offset = manifest["rows"] * np.dtype(dtype).itemsize
+        with open(paths[name], "r+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            df[name].to_numpy(dtype=dtype).tofile(f)
+    manifest.update(rows=manifest["rows"] + len(df), last=int(df["timestamp"].iloc[-1]), types=types)
+    _write_manifest(directory, manifest)
+
+
+def _map_columns(directory, manifest):
+    return {
+        name: np.memmap(_column_path(directory, manifest["generation"], name), dtype=dtype, mode="r",
+                        shape=(manifest["rows"],))
+        for name, dtype in CACHE_COLUMNS.items()
+    }
+
+
+def _cached_frame(symbol, asset_type, interval, lower, upper):
+    """Zero-copy OHLCV frame over the cached columns in [lower, upper), or None to fall back to SQLite"""
+    directory = _cache_dir(symbol, interval)
+    manifest = _read_manifest(directory)
+    try:
+        if manifest is None:
+            manifest = rebuild_column_cache(symbol, interval)
+            if manifest is None:
+                return None
+        if manifest["types"] != [asset_type]:
+            return None  # other or mixed types for this key: SQLite applies the type filter
+        try:
+            columns = _map_columns(directory, manifest)
+        except (OSError, ValueError):
+            # Files replaced or truncated under us by another writer: start a fresh generation
+            manifest = rebuild_column_cache(symbol, interval)
+            columns = _map_columns(directory, manifest)
+    except (OSError, ValueError, TypeError, sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"Column cache unavailable for {symbol} ({interval}): {e}")
+        return None
+
+    timestamps = columns["timestamp"]
+    lo, hi = np.searchsorted(timestamps, [lower, upper], side="left")
+    index = pd.DatetimeIndex(from_epoch(np.asarray(timestamps[lo:hi])), name="timestamp")
+    return pd.DataFrame({field: columns[field][lo:hi] for field in CANDLE_FIELDS}, index=index, copy=False)
@@ -1,64 +1,88 @@
-from sqlalchemy import create_engine
-import pandas as pd
+import numpy as np
 import sqlite3
 
-engine = create_engine('sqlite:///app/db/market_data.db')
+from app.backtest.result_store import invalidate_range
+from app.data.candles import (
+    MARKET_DB_PATH, ensure_schema, from_epoch, latest_timestamp, read_sql, sync_column_cache, to_epoch,
+)
 
-# To fetch missing data only, not used yet
-def get_latest_timestamp(symbol: str, interval: str, db_path="app/db/market_data.db"):
+DB_PATH = MARKET_DB_PATH
+
+# Newest stored bar; ingest.plan_ingest() uses it to fetch missing data only
+def get_latest_timestamp(symbol: str, interval: str, db_path=None):
+    return latest_timestamp(symbol, interval, db_path)
+
+
+# --- Bulk Writes ---
+
+CANDLE_COLUMNS = ["symbol", "type", "interval", "timestamp", "open", "high", "low", "close", "volume"]
+
+
+def init_db(db_path=DB_PATH):
+    """Create (or migrate) the candles table and switch the database to WAL; runs once per path per process"""
+    ensure_schema(db_path)
+
+
+def _connect_for_write(db_path):
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT MAX(timestamp)
-        FROM candles
-        WHERE symbol = ? AND interval = ?
-    """, (symbol, interval))
-    result = cursor.fetchone()[0]
-    conn.close()
-    return pd.to_datetime(result) if result else None
-
-
-def save_to_db(df):
-    conn = sqlite3.connect("app/db/market_data.db")
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS candles (
-            symbol TEXT NOT NULL,
-            type TEXT,
-            interval TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            open REAL,
-            high REAL,
-            low REAL,
-            close REAL,
-            volume REAL,
-            PRIMARY KEY (symbol, interval, timestamp)
-        )
-    """)
-
-    # Insert row-by-row with duplicate protection
-    for _, row in df.iterrows():
-        try:
-            cursor.execute("""
-                INSERT INTO candles (symbol, type, interval, timestamp, open, high, low, close, volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(row["symbol"]),
-                str(row["type"]),
-                str(row["interval"]),
-                str(row["timestamp"]),
-                float(row["open"]),
-                float(row["high"]),
-                float(row["low"]),
-                float(row["close"]),
-                int(row["volume"])
-            ))
-        except sqlite3.IntegrityError:
-            continue
-
-    conn.commit()
-    conn.close()
+    conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, fsyncs only at checkpoints
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    return conn
+
+
+def _candle_rows(df):
+    """DataFrame -> list of candles tuples, built column-wise"""
+    columns = [
+        df["symbol"].astype(str).tolist(),
+        df["type"].astype(str).tolist(),
+        df["interval"].astype(str).tolist(),
+        to_epoch(df["timestamp"]).tolist(),
+    ]
+    columns += [df[name].to_numpy(dtype=float).tolist() for name in ("open", "high", "low", "close")]
+    columns.append(df["volume"].to_numpy(dtype=float).astype(np.int64).tolist())
+    return list(zip(*columns))
+
+
+def save_to_db(df, db_path=DB_PATH, batch_size=50_000):
+    """
+    Bulk-insert candles, ignoring rows whose (symbol, interval, timestamp)
+    is already stored. Returns {"inserted": n, "skipped": m}.
+    """
+    init_db(db_path)
+    if df.empty:
+        return {"inserted": 0, "skipped": 0}
+
+    df = df[CANDLE_COLUMNS]
+    conn = _connect_for_write(db_path)
+    inserted = {}  # (symbol, interval) -> (rows written, first, last timestamp of the batch)
+    try:
+        with conn:
+            for (symbol, interval), group in df.groupby(["symbol", "interval"], sort=False):
+                rows = _candle_rows(group)
+                before = conn.total_changes
+                for start in range(0, len(rows), batch_size):
+                    conn.executemany("""
+                        INSERT OR IGNORE INTO candles (symbol, type, interval, timestamp, open, high, low, close, volume)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, rows[start:start + batch_size])
+                count = conn.total_changes - before
+                if count:
+                    timestamps = [row[3] for row in rows]
+                    inserted[(str(symbol), str(interval))] = (count, min(timestamps), max(timestamps))
+    finally:
+        conn.close()
+
+    # Column caches and cached backtests over the touched ranges no longer match the data
+    for (symbol, interval), (_, start, end) in inserted.items():
+        sync_column_cache(symbol, interval, db_path)
+        invalidate_range(symbol, interval, from_epoch(start), from_epoch(end))
+
+    total = sum(count for count, _, _ in inserted.values())
+    return {"inserted": total, "skipped": len(df) - total}
+
 
 def read_from_db(table_name):
-    return pd.read_sql(f"SELECT * FROM candles where symbol='{table_name}'", engine)
+    df = read_sql("SELECT * FROM candles WHERE symbol = ?", (table_name,))
+    df["timestamp"] = from_epoch(df["timestamp"])
+    return df
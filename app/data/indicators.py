@@ -8,13 +8,20 @@ def compute_ema(df, window):
     return df['close'].ewm(span=window, adjust=False).mean()
 
 def compute_rsi(df, window):
-    return ta.rsi(df['close'], length=window)
+    # talib=False pins pandas_ta's own Wilder smoothing (what StreamingRSI reproduces)
+    return ta.rsi(df['close'], length=window, talib=False)
 
 def compute_macd(df):
-    return ta.macd(df['close'])  # returns DataFrame
+    return ta.macd(df['close'], talib=False)  # returns DataFrame
 
 def compute_bbands(df, window):
-    return ta.bbands(df['close'], length=window)
+    return ta.bbands(df['close'], length=window, talib=False)
+
+def compute_stoch(df, window):
+    return ta.stoch(df['high'], df['low'], df['close'], k=window)  # returns DataFrame
+
+def compute_willr(df, window):
+    return ta.willr(df['high'], df['low'], df['close'], length=window, talib=False)
 
 
 # Supported indicator/function map
@@ -24,6 +31,8 @@ INDICATOR_FUNCTIONS = {
     "rsi": compute_rsi,
     "macd": compute_macd,
     "bbands": compute_bbands,
+    "stoch": compute_stoch,
+    "willr": compute_willr,
 }
 
 def apply_indicators(df: pd.DataFrame, indicators: dict) -> pd.DataFrame:
@@ -56,8 +65,8 @@ def apply_indicators(df: pd.DataFrame, indicators: dict) -> pd.DataFrame:
 
 
 # Testing
-from fetch_alpha_vantage import fetch_stock_data  # your ingestion module
 if __name__ == "__main__":
+    from fetch_alpha_vantage import fetch_stock_data  # your ingestion module
     df = fetch_stock_data("AAPL")
 
     indicators = {
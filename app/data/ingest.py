@@ -1,21 +1,116 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
 from .fetch_alpha_vantage import fetch_stock_data, fetch_crypto_data
-from .db import save_to_db
+from .db import save_to_db, get_latest_timestamp
+from .candles import read_sql, to_epoch
+from app.backtest.incremental import refresh_tracked
 
-def ingest_stock(symbol="AAPL", interval="daily", outputsize="compact"):
-    df = fetch_stock_data(symbol, interval, outputsize)
-    save_to_db(df)
+# Alpha Vantage's outputsize=compact returns the latest 100 bars
+COMPACT_BARS = 100
 
-    table_name = symbol.replace("/", "_")
-    csv_path = f"app/db/{table_name}.csv"
-    df.to_csv(csv_path, index=False)
+BAR_LENGTH = {
+    "1min": pd.Timedelta(minutes=1),
+    "5min": pd.Timedelta(minutes=5),
+    "15min": pd.Timedelta(minutes=15),
+    "30min": pd.Timedelta(minutes=30),
+    "60min": pd.Timedelta(minutes=60),
+    "daily": pd.Timedelta(days=1),
+    "weekly": pd.Timedelta(weeks=1),
+    "monthly": pd.Timedelta(days=31),
+}
 
-def ingest_crypto(symbol="BTC", interval="daily"):
-    market = "USD"
-    df = fetch_crypto_data(symbol, market, interval)
 
-    save_to_db(df)
+# --- Planning ---
+
+def plan_ingest(symbol, interval, now=None):
+    """
+    Decide how to refresh (symbol, interval) from its stored coverage:
+    'skip' when the newest stored bar is less than one bar old, 'compact' when
+    the missing stretch fits in the latest COMPACT_BARS bars, 'full' when it
+    does not or nothing is stored. The gap is measured in calendar time (bars
+    are timestamped US/Eastern), which over-counts nights and weekends, so
+    borderline cases fall back to 'full' rather than leave a hole.
+    """
+    try:
+        latest = get_latest_timestamp(symbol, interval)
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        latest = None
+    if latest is None:
+        return {"outputsize": "full", "latest": None, "missing_bars": None}
+
+    now = now if now is not None else pd.Timestamp.now(tz="America/New_York").tz_localize(None)
+    missing = max(0, int((now - latest) / BAR_LENGTH[interval]))
+    if missing < 1:
+        outputsize = "skip"
+    elif missing < COMPACT_BARS:
+        outputsize = "compact"
+    else:
+        outputsize = "full"
+    return {"outputsize": outputsize, "latest": str(latest), "missing_bars": missing}
+
+
+def missing_rows(df, symbol, interval):
+    """Rows of a fetched payload whose timestamps are not stored yet (new bars and gaps alike)"""
+    if df.empty:
+        return df
+    epochs = to_epoch(df["timestamp"])
+    try:
+        stored = read_sql(
+            "SELECT timestamp FROM candles WHERE symbol = ? AND interval = ? AND timestamp >= ? AND timestamp <= ?",
+            (symbol, interval, int(epochs.min()), int(epochs.max())),
+        )["timestamp"].to_numpy()
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        # No database (or table) yet: nothing is stored, as in plan_ingest()
+        return df
+    return df.loc[~np.isin(epochs, stored)]
+
 
-    table_name = symbol.replace("/", "_")
+# --- Ingestion ---
 
-    csv_path = f"app/db/{table_name}.csv"
-    df.to_csv(csv_path, index=False)
+def _write_new_rows(df, symbol, interval, plan):
+    """Store only the missing rows, append them to the symbol's CSV and report fetched vs written"""
+    fetched = len(df)
+    new = missing_rows(df, symbol, interval)
+    counts = save_to_db(new) if not new.empty else {"inserted": 0, "skipped": 0}
+    if counts["inserted"]:
+        # Gap fills can land before a tracked state's last bar; refresh_tracked() recomputes those
+        refresh_tracked(symbol, interval, backfilled_from=int(to_epoch(new["timestamp"]).min()))
+
+        table_name = symbol.replace("/", "_")
+        csv_path = f"app/db/{table_name}.csv"
+        new.to_csv(csv_path, mode="a", header=not os.path.exists(csv_path), index=False)
+
+    report = {
+        "symbol": symbol,
+        "interval": interval,
+        "outputsize": plan["outputsize"],
+        "fetched": fetched,
+        "written": counts["inserted"],
+    }
+    print(f"{symbol} {interval} ({plan['outputsize']}): {fetched} candles fetched, {counts['inserted']} written")
+    return report
+
+
+def ingest_stock(symbol="AAPL", interval="daily", outputsize=None):
+    """Fetch and store new stock candles; `outputsize=None` lets plan_ingest() pick (or skip) the download"""
+    plan = plan_ingest(symbol, interval) if outputsize is None else {"outputsize": outputsize}
+    if plan["outputsize"] == "skip":
+        return _write_new_rows(pd.DataFrame(), symbol, interval, plan)
+
+    df = fetch_stock_data(symbol, interval, plan["outputsize"])
+    return _write_new_rows(df, symbol, interval, plan)
+
+def ingest_crypto(symbol="BTC", interval="daily"):
+    """Fetch and store new crypto candles (the crypto endpoints always return the full history)"""
+    market = "USD"
+    plan = plan_ingest(symbol, interval)
+    if plan["outputsize"] == "skip":
+        return _write_new_rows(pd.DataFrame(), symbol, interval, plan)
+
+    plan["outputsize"] = "full"
+    df = fetch_crypto_data(symbol, market, interval)
+    return _write_new_rows(df, symbol, interval, plan)
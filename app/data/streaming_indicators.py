@@ -0,0 +1,341 @@
+import math
+import sys
+from collections import deque
+
+NAN = float("nan")
+
+
+def _to_json(value):
+    """NaN -> None so snapshots are strict JSON (json.dumps(..., allow_nan=False))"""
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _from_json(value):
+    if isinstance(value, list):
+        return [_from_json(item) for item in value]
+    return NAN if value is None else value
+
+
+# --- Building blocks ---
+
+class _Window:
+    """Fixed-size ring buffer with Kahan-compensated running sum (matches pandas rolling mean)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self._comp = 0.0
+
+    def _add(self, x):
+        y = x - self._comp
+        t = self.total + y
+        self._comp = (t - self.total) - y
+        self.total = t
+
+    def push(self, x):
+        if len(self.values) == self.size:
+            self._add(-self.values[0])
+        self.values.append(x)
+        self._add(x)
+
+    @property
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / self.size if self.full else NAN
+
+    def snapshot(self):
+        return _to_json({"values": list(self.values), "total": self.total, "comp": self._comp})
+
+    def restore(self, state):
+        self.values = deque(_from_json(state["values"]), maxlen=self.size)
+        self.total = _from_json(state["total"])
+        self._comp = _from_json(state["comp"])
+
+
+class _MonotonicExtreme:
+    """Rolling max (or min) over the last `size` bars via a monotonic deque"""
+
+    def __init__(self, size, mode="max"):
+        self.size = size
+        self.mode = mode
+        self.count = 0
+        self.queue = deque()  # (bar number, value)
+
+    def push(self, x):
+        beats = (lambda a, b: a >= b) if self.mode == "max" else (lambda a, b: a <= b)
+        while self.queue and beats(x, self.queue[-1][1]):
+            self.queue.pop()
+        self.queue.append((self.count, x))
+        if self.queue[0][0] <= self.count - self.size:
+            self.queue.popleft()
+        self.count += 1
+        return self.queue[0][1] if self.count >= self.size else NAN
+
+    def snapshot(self):
+        return {"count": self.count, "queue": _to_json(list(self.queue))}
+
+    def restore(self, state):
+        self.count = state["count"]
+        self.queue = deque(tuple(item) for item in _from_json(state["queue"]))
+
+
+class _StreamingIndicator:
+    """Common snapshot/restore for indicators whose state is plain attributes"""
+
+    _state_fields = ()
+    _children = ()
+
+    def snapshot(self):
+        state = {name: _to_json(getattr(self, name)) for name in self._state_fields}
+        for name in self._children:
+            state[name] = getattr(self, name).snapshot()
+        return state
+
+    def restore(self, state):
+        for name in self._state_fields:
+            setattr(self, name, _from_json(state[name]))
+        for name in self._children:
+            getattr(self, name).restore(state[name])
+        return self
+
+
+def _close(candle):
+    return float(candle["close"]) if not isinstance(candle, (int, float)) else float(candle)
+
+
+# --- Indicators ---
+
+class StreamingSMA(_StreamingIndicator):
+    """Matches compute_sma: rolling mean, NaN until `window` bars"""
+
+    _children = ("buffer",)
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = _Window(window)
+
+    def update(self, candle):
+        self.buffer.push(_close(candle))
+        return self.buffer.mean()
+
+
+class StreamingEMA(_StreamingIndicator):
+    """
+    Matches compute_ema (ewm(span, adjust=False), seeded with the first close).
+    With `sma_seed=True` it instead matches pandas_ta's ema: NaN for the first
+    window-1 bars, seeded with their SMA.
+    """
+
+    _state_fields = ("value", "count", "seed_total")
+
+    def __init__(self, window, sma_seed=False):
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.sma_seed = sma_seed
+        self.value = NAN
+        self.count = 0
+        self.seed_total = 0.0
+
+    def update(self, candle):
+        x = _close(candle)
+        self.count += 1
+        if self.sma_seed and self.count <= self.window:
+            self.seed_total += x
+            if self.count < self.window:
+                return NAN
+            self.value = self.seed_total / self.window
+        elif self.count == 1:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class _AdjustedEWM(_StreamingIndicator):
+    """ewm(alpha, adjust=True, min_periods) as used by pandas_ta's rma"""
+
+    _state_fields = ("num", "den", "count")
+
+    def __init__(self, alpha, min_periods):
+        self.decay = 1 - alpha
+        self.min_periods = min_periods
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+
+    def update(self, x):
+        self.num = x + self.decay * self.num
+        self.den = 1 + self.decay * self.den
+        self.count += 1
+        return self.num / self.den if self.count >= self.min_periods else NAN
+
+
+class StreamingRSI(_StreamingIndicator):
+    """Wilder RSI, matching compute_rsi (pandas_ta rsi: rma = ewm(alpha=1/window))"""
+
+    _state_fields = ("prev_close",)
+    _children = ("gain", "loss")
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = NAN
+        self.gain = _AdjustedEWM(1 / window, window)
+        self.loss = _AdjustedEWM(1 / window, window)
+
+    def update(self, candle):
+        x = _close(candle)
+        if math.isnan(self.prev_close):
+            self.prev_close = x
+            return NAN
+        change = x - self.prev_close
+        self.prev_close = x
+        gain = self.gain.update(max(change, 0.0))
+        loss = self.loss.update(-min(change, 0.0))
+        # A flat run decays both averages to 0; pandas_ta's 0 / 0 gives NaN
+        return 100 * gain / (gain + loss) if gain + loss else NAN
+
+
+class StreamingMACD(_StreamingIndicator):
+    """Matches compute_macd (pandas_ta macd): returns (macd, histogram, signal)"""
+
+    _children = ("fast_ema", "slow_ema", "signal_ema")
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast_ema = StreamingEMA(fast, sma_seed=True)
+        self.slow_ema = StreamingEMA(slow, sma_seed=True)
+        self.signal_ema = StreamingEMA(signal, sma_seed=True)
+
+    def update(self, candle):
+        macd = self.fast_ema.update(candle) - self.slow_ema.update(candle)
+        if math.isnan(macd):
+            return NAN, NAN, NAN
+        signal = self.signal_ema.update(macd)
+        return macd, macd - signal, signal
+
+
+class StreamingBollinger(_StreamingIndicator):
+    """
+    Matches compute_bbands (pandas_ta bbands, population std):
+    returns (lower, mid, upper, bandwidth, percent).
+    Variance is kept with Welford add/remove updates to avoid cancellation.
+    """
+
+    _state_fields = ("mean", "m2")
+    _children = ("buffer",)
+
+    def __init__(self, window=20, std=2.0):
+        self.window = window
+        self.std = std
+        self.buffer = _Window(window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, candle):
+        x = _close(candle)
+        n = len(self.buffer.values)
+        if n == self.window:
+            old = self.buffer.values[0]
+            new_mean = self.mean + (x - old) / n
+            self.m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        else:
+            n += 1
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        self.buffer.push(x)
+
+        if not self.buffer.full:
+            return NAN, NAN, NAN, NAN, NAN
+        mid = self.buffer.mean()
+        dev = self.std * math.sqrt(max(self.m2, 0.0) / self.window)
+        lower, upper = mid - dev, mid + dev
+        bandwidth = 100 * (upper - lower) / mid if mid else NAN
+        percent = (x - lower) / (upper - lower) if upper != lower else NAN
+        return lower, mid, upper, bandwidth, percent
+
+
+class StreamingStochastic(_StreamingIndicator):
+    """Matches compute_stoch (pandas_ta stoch): returns (%K, %D)"""
+
+    _children = ("highest", "lowest", "k_smooth", "d_smooth")
+
+    def __init__(self, k=14, d=3, smooth_k=3):
+        self.highest = _MonotonicExtreme(k, "max")
+        self.lowest = _MonotonicExtreme(k, "min")
+        self.k_smooth = _Window(smooth_k)
+        self.d_smooth = _Window(d)
+
+    def update(self, candle):
+        hh = self.highest.push(float(candle["high"]))
+        ll = self.lowest.push(float(candle["low"]))
+        if math.isnan(hh):
+            return NAN, NAN
+        # pandas_ta divides by a non-zero range (epsilon on flat windows), so %K stays defined
+        self.k_smooth.push(100 * (_close(candle) - ll) / ((hh - ll) or sys.float_info.epsilon))
+        k = self.k_smooth.mean()
+        if math.isnan(k):
+            return NAN, NAN
+        self.d_smooth.push(k)
+        return k, self.d_smooth.mean()
+
+
+class StreamingWilliamsR(_StreamingIndicator):
+    """Matches compute_willr (pandas_ta willr)"""
+
+    _children = ("highest", "lowest")
+
+    def __init__(self, window=14):
+        self.highest = _MonotonicExtreme(window, "max")
+        self.lowest = _MonotonicExtreme(window, "min")
+
+    def update(self, candle):
+        hh = self.highest.push(float(candle["high"]))
+        ll = self.lowest.push(float(candle["low"]))
+        if math.isnan(hh) or hh == ll:
+            return NAN
+        return 100 * ((_close(candle) - ll) / (hh - ll) - 1)
+
+
+# Streaming counterparts of INDICATOR_FUNCTIONS in indicators.py
+STREAMING_INDICATORS = {
+    "sma": lambda conf: StreamingSMA(conf.get("window", 14)),
+    "ema": lambda conf: StreamingEMA(conf.get("window", 14)),
+    "rsi": lambda conf: StreamingRSI(conf.get("window", 14)),
+    "macd": lambda conf: StreamingMACD(conf.get("fast", 12), conf.get("slow", 26), conf.get("signal", 9)),
+    "bbands": lambda conf: StreamingBollinger(conf.get("window", 14), conf.get("std", 2.0)),
+    "stoch": lambda conf: StreamingStochastic(conf.get("window", 14), conf.get("d", 3), conf.get("smooth_k", 3)),
+    "willr": lambda conf: StreamingWilliamsR(conf.get("window", 14)),
+}
+
+
+class IndicatorStream:
+    """
+    A set of streaming indicators for one symbol, built from the same
+    config format as apply_indicators(), e.g. {"RSI_14": {"type": "rsi", "window": 14}}.
+    """
+
+    def __init__(self, indicators: dict):
+        self.indicators = {}
+        for name, conf in indicators.items():
+            kind = conf["type"].lower()
+            if kind not in STREAMING_INDICATORS:
+                raise ValueError(f"Unsupported indicator type: {kind}")
+            self.indicators[name] = STREAMING_INDICATORS[kind](conf)
+
+    def update(self, candle):
+        """Feed one candle (mapping with high/low/close) and return every indicator's latest value"""
+        return {name: indicator.update(candle) for name, indicator in self.indicators.items()}
+
+    def snapshot(self):
+        return {name: indicator.snapshot() for name, indicator in self.indicators.items()}
+
+    def restore(self, state):
+        for name, indicator in self.indicators.items():
+            indicator.restore(state[name])
+        return self
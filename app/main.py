@@ -1,6 +1,10 @@
 from fastapi import FastAPI
 from app.api import routes
+from app.data.db import init_db
 
 fastapi_app = FastAPI()
 
+# Candle schema and WAL mode are set up once, not on every write
+init_db()
+
 fastapi_app.include_router(routes.router, prefix="/api")
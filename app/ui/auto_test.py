@@ -5,12 +5,14 @@ import requests
 from dotenv import load_dotenv
 import datetime
 import os
+import time
 
 load_dotenv()
 
 API_BASE_URL = os.getenv("API_BASE_URL")
 
 BACKTEST_API_URL = f"{API_BASE_URL}/autotest"  # Change this if your backend is hosted elsewhere
+BACKTEST_JOBS_URL = f"{API_BASE_URL}/autotest/jobs"
 
 def render():
     col1, col2, col3 = st.columns([1.5, 2, 1.5])
@@ -19,6 +21,9 @@ def render():
 
     with col2:
         ranking_metric = st.selectbox("Ranking Metric", ["sharpe", "sortino", "calmar", "pnl", "max_drawdown"])
+        search_mode = st.selectbox("Search Mode", ["exhaustive", "halving", "random", "tpe"],
+                                   help="'halving' drops weak combos early on a prefix of the data; "
+                                        "'random'/'tpe' sample continuous parameter ranges under a fixed budget")
 
     today = datetime.date.today()
     default_start = today - datetime.timedelta(days=180)  # 6 months ago
@@ -49,16 +54,39 @@ def render():
         st.markdown(f"### 📥 Running backtest for `{symbol}` on `{interval}` interval...")
 
         try:
-            response = requests.get(BACKTEST_API_URL, json={
+            job_response = requests.post(BACKTEST_JOBS_URL, json={
                 "initial_capital": initial_capital,
                 "ranking_metric": ranking_metric,
                 "asset_type": asset_type,
                 "symbol": symbol,
                 "interval": interval,
                 "start_date": start_date.isoformat(),
-                "end_date": end_date.isoformat()
+                "end_date": end_date.isoformat(),
+                "search_mode": search_mode
                 })
 
+            if job_response.status_code != 200 or job_response.json().get("status") != "success":
+                st.error(f"❌ API Error: {job_response.status_code} {job_response.text}")
+                return
+
+            # Poll the background job instead of holding one long request open
+            job_id = job_response.json()["job_id"]
+            progress_bar = st.progress(0, text="Queued...")
+            while True:
+                job = requests.get(f"{BACKTEST_JOBS_URL}/{job_id}").json()["job"]
+                done, total = job["progress"]["completed"], job["progress"]["total"]
+                if total:
+                    progress_bar.progress(done / total, text=f"Tested {done}/{total} combinations")
+                if job["status"] in ("done", "failed", "cancelled"):
+                    break
+                time.sleep(1)
+
+            if job["status"] != "done":
+                st.error(f"❌ Backtest {job['status']}: {job.get('error') or ''}")
+                return
+
+            response = requests.get(f"{BACKTEST_JOBS_URL}/{job_id}/result")
+
             if response.status_code != 200:
                 st.error(f"❌ API Error: {response.status_code}")
                 return
@@ -1,14 +1,19 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import plotly.graph_objects as go
 import os
+import sys
 from datetime import datetime, timedelta, timezone
 import requests
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The UI runs its modules top-level from app/ui (where app.py shadows the `app` package),
+# so the shared data-access module is imported from its own directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data")))
+from candles import load_candles
+
 @st.cache_data
 def load_csv_data(symbol, interval):
     filename = f"db/{symbol}_{interval}.csv"
@@ -21,18 +26,7 @@ def load_csv_data(symbol, interval):
 
 @st.cache_data(ttl=60)
 def load_sqlite_data(symbol, asset_type, interval):
-    conn = sqlite3.connect("../db/market_data.db")
-    query = f"""
-        SELECT * FROM candles 
-        WHERE symbol='{symbol}' AND type='{asset_type}' AND interval='{interval}'
-        ORDER BY timestamp"""
-    try:
-        df = pd.read_sql_query(query, conn, parse_dates=["timestamp"])
-    except Exception as e:
-        st.warning(f"Error: {e}")
-        df = pd.DataFrame()
-    conn.close()
-    return df
+    return load_candles(symbol, asset_type, interval).reset_index()
 
 # freshness check
 def is_data_stale(df: pd.DataFrame) -> bool:
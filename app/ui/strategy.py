@@ -1,8 +1,14 @@
 import streamlit as st
 import pandas as pd
 import json
-import time
-import random
+import os
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_BASE_URL = os.getenv("API_BASE_URL")
+STRATEGY_BACKTEST_URL = f"{API_BASE_URL}/strategy/backtest"
 
 def render():
     st.header("Strategy Testing")
@@ -145,21 +151,37 @@ def render():
                 end_date = st.date_input("End Date")
                 risk_per_trade = st.slider("Risk per Trade (%)", 1, 10, 2)
             
+            # Candles come from the symbol selected on the main chart
+            asset_type = st.session_state.get("asset_type")
+            symbol = st.session_state.get("symbol")
+            interval = st.session_state.get("interval")
+
             if st.button("🚀 Run Backtest", type="primary"):
-                with st.spinner("Running backtest..."):
-                    # Simulate backtesting process
-                    progress_bar = st.progress(0)
-                    for i in range(100):
-                        time.sleep(0.01)
-                        progress_bar.progress(i + 1)
-                    
-                    # Generate mock results
-                    total_return = random.uniform(-20, 50)
-                    win_rate = random.uniform(40, 80)
-                    max_drawdown = random.uniform(5, 25)
-                    sharpe_ratio = random.uniform(0.5, 2.5)
-                    
-                    st.success("✅ Backtest completed!")
+                with st.spinner(f"Running backtest on {symbol} ({interval})..."):
+                    try:
+                        response = requests.post(STRATEGY_BACKTEST_URL, json={
+                            "strategy": strategy_data,
+                            "initial_capital": capital,
+                            "asset_type": asset_type,
+                            "symbol": symbol,
+                            "interval": interval,
+                            "start_date": start_date.isoformat(),
+                            "end_date": end_date.isoformat(),
+                        })
+                        result = response.json()
+                    except Exception as e:
+                        result = {"status": "error", "message": str(e)}
+
+                if result.get("status") != "success":
+                    st.error(f"❌ {result.get('message', 'Backtest failed')}")
+                else:
+                    stats = result["data"]["stats"]
+                    total_return = stats["pnl_percent"]
+                    win_rate = stats["win_rate"] * 100
+                    max_drawdown = abs(stats["max_drawdown"]) * 100
+                    sharpe_ratio = stats["sharpe_ratio"]
+
+                    st.success(f"✅ Backtest completed! {stats['total_trades']} trades")
                     
                     # Display results
                     result_col1, result_col2, result_col3, result_col4 = st.columns(4)
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Storage locations are read from the environment at import time: point every
+# database at a scratch directory before any app module is imported.
+_scratch = tempfile.mkdtemp(prefix="backtest-tests-")
+os.environ["MARKET_DB_PATH"] = os.path.join(_scratch, "market_data.db")
+os.environ["CANDLE_CACHE_DIR"] = os.path.join(_scratch, "columns")
+os.environ["STRATEGY_STATE_DB"] = os.path.join(_scratch, "strategy_state.db")
+os.environ["BACKTEST_CACHE_DB"] = os.path.join(_scratch, "backtest_cache.db")
@@ -0,0 +1,81 @@
+"""backtest_matrix() against per-combo backtest(), and signal dedup against scoring every combo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from app.backtest.engine import (
+    backtest, backtest_matrix, get_adaptive_strategy_grid, _evaluate_combos, METRIC_KEYS,
+)
+from app.backtest.indicator_cache import IndicatorCache
+
+
+# --- Fixtures ---
+
+def random_candles(n, seed, flat=None):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    if flat is not None:
+        close[flat[0]:flat[1]] = close[flat[0]]
+    index = pd.date_range('2020-01-01', periods=n, freq='D')
+    return pd.DataFrame({'open': close, 'high': close * 1.005, 'low': close * 0.995, 'close': close, 'volume': 1.0},
+                        index=index)
+
+def signal_columns(df, seed):
+    """A mix of strategy signals, random 0/1 positions and the always-flat / always-long edge cases"""
+    grid = get_adaptive_strategy_grid(len(df))
+    columns = [
+        grid['SMA']['func'](df, short=10, long=50),
+        grid['RSI']['func'](df, low=30, high=70, length=14),
+        grid['Bollinger']['func'](df, window=20, stddev=2),
+    ]
+    rng = np.random.default_rng(seed)
+    columns += [pd.Series((rng.random(len(df)) > p).astype(float), index=df.index) for p in (0.3, 0.9)]
+    columns += [pd.Series(0.0, index=df.index), pd.Series(1.0, index=df.index)]
+    return columns
+
+SERIES = [
+    (600, 1, None),
+    (600, 2, (200, 320)),  # flat prices: zero returns, zero std on some columns
+    (60, 3, None),
+]
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("n,seed,flat", SERIES)
+def test_backtest_matrix_matches_backtest(n, seed, flat):
+    df = random_candles(n, seed, flat)
+    columns = signal_columns(df, seed)
+    metrics = backtest_matrix(df['close'].to_numpy(), np.column_stack(columns))
+    for j, signals in enumerate(columns):
+        reference = backtest(df, signals, include_curve=False)
+        for key in METRIC_KEYS:
+            assert metrics[key][j] == pytest.approx(reference[key], rel=1e-9, abs=1e-12), (j, key)
+
+
+@pytest.mark.parametrize("n", [0, 1])
+def test_backtest_matrix_on_too_short_series(n):
+    metrics = backtest_matrix(np.ones(n), np.ones((n, 3)))
+    assert all(np.array_equal(metrics[key], np.zeros(3)) for key in METRIC_KEYS)
+
+
+@pytest.mark.parametrize("max_bytes", [256 * 1024 * 1024, 1])  # 1 byte: every memo is evicted at once
+def test_signal_dedup_matches_scoring_every_combo(max_bytes):
+    df = random_candles(800, 4)
+    grid = get_adaptive_strategy_grid(len(df))
+    # Oversold levels below the indicator's range never trigger, so many combos share one signal
+    combos = [{'low': low, 'high': high, 'length': 14} for low in (1, 2, 3, 25, 30) for high in (60, 70, 99)]
+    func = grid['RSI']['func']
+
+    cache = IndicatorCache(max_bytes=max_bytes)
+    deduped = _evaluate_combos(df, 'RSI', func, combos + combos, 10000, cache, chunk_size=8, min_trades=0)
+    if max_bytes > 1:
+        assert cache.duplicate_signals >= len(combos)
+
+    for params, stats in deduped:
+        reference = backtest(df, func(df, **params), include_curve=False)
+        for key in METRIC_KEYS:
+            assert stats[key] == pytest.approx(reference[key], rel=1e-9, abs=1e-12), (params, key)
+    assert len(deduped) == 2 * len(combos)
@@ -0,0 +1,99 @@
+"""Parity of the vectorized crossover strategies with the original per-bar loop versions."""
+import numpy as np
+import pandas as pd
+import pytest
+
+ta = pytest.importorskip("pandas_ta")
+
+from app.backtest.engine import sma_crossover, ema_crossover, macd_strategy
+
+
+# --- Reference loop implementations (pre-vectorization) ---
+
+def _loop_signal(fast_line, slow_line):
+    signal = pd.Series(0, index=fast_line.index)
+    for i in range(1, len(fast_line)):
+        if pd.notna(fast_line.iloc[i]) and pd.notna(slow_line.iloc[i]):
+            if fast_line.iloc[i] > slow_line.iloc[i]:
+                signal.iloc[i] = 1
+            else:
+                signal.iloc[i] = 0
+        else:
+            signal.iloc[i] = signal.iloc[i-1] if i > 0 else 0
+    return signal.shift(1).fillna(0)
+
+def loop_sma_crossover(df, short, long):
+    if short >= long or long >= len(df) * 0.8:
+        return pd.Series(0, index=df.index)
+    sma_short = ta.sma(df['close'], length=short)
+    sma_long = ta.sma(df['close'], length=long)
+    if sma_short.isna().all() or sma_long.isna().all():
+        return pd.Series(0, index=df.index)
+    return _loop_signal(sma_short, sma_long)
+
+def loop_ema_crossover(df, short, long):
+    if short >= long or long >= len(df) * 0.8:
+        return pd.Series(0, index=df.index)
+    ema_short = ta.ema(df['close'], length=short)
+    ema_long = ta.ema(df['close'], length=long)
+    if ema_short.isna().all() or ema_long.isna().all():
+        return pd.Series(0, index=df.index)
+    return _loop_signal(ema_short, ema_long)
+
+def loop_macd_strategy(df, fast=12, slow=26, signal_period=9):
+    macd_data = ta.macd(df['close'], fast=fast, slow=slow, signal=signal_period)
+    if macd_data is None or macd_data.empty:
+        return pd.Series(0, index=df.index)
+    macd_line = macd_data.iloc[:, 0].reindex(df.index, fill_value=np.nan)
+    signal_line = macd_data.iloc[:, 1].reindex(df.index, fill_value=np.nan)
+    return _loop_signal(macd_line, signal_line)
+
+
+# --- Fixtures ---
+
+def random_walk(n, seed, nan_stretches=0):
+    """Seeded OHLCV random walk; `nan_stretches` blanks out runs of closes mid-series"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    for _ in range(nan_stretches):
+        start = rng.integers(0, max(1, n - 10))
+        close[start:start + rng.integers(1, 10)] = np.nan
+    index = pd.date_range('2020-01-01', periods=n, freq='5min')
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0}, index=index)
+
+SERIES = [
+    (400, 1, 0),
+    (1500, 2, 0),
+    (800, 3, 4),  # NaN stretches inside the data, on top of the indicator warm-up
+    (30, 4, 0),   # short enough that the longer windows are skipped
+    (5, 5, 0),
+]
+
+
+def assert_same_signal(new, reference):
+    assert len(new) == len(reference)
+    assert np.array_equal(np.asarray(new, dtype=float), np.asarray(reference, dtype=float))
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("n,seed,nan_stretches", SERIES)
+@pytest.mark.parametrize("short,long", [(5, 20), (10, 50), (20, 200), (20, 10)])
+def test_sma_crossover_matches_loop(n, seed, nan_stretches, short, long):
+    df = random_walk(n, seed, nan_stretches)
+    assert_same_signal(sma_crossover(df, short, long), loop_sma_crossover(df, short, long))
+
+
+@pytest.mark.parametrize("n,seed,nan_stretches", SERIES)
+@pytest.mark.parametrize("short,long", [(5, 20), (12, 26), (20, 200), (20, 10)])
+def test_ema_crossover_matches_loop(n, seed, nan_stretches, short, long):
+    df = random_walk(n, seed, nan_stretches)
+    assert_same_signal(ema_crossover(df, short, long), loop_ema_crossover(df, short, long))
+
+
+@pytest.mark.parametrize("n,seed,nan_stretches", SERIES)
+@pytest.mark.parametrize("fast,slow,signal_period", [(12, 26, 9), (5, 35, 5), (8, 17, 9)])
+def test_macd_strategy_matches_loop(n, seed, nan_stretches, fast, slow, signal_period):
+    df = random_walk(n, seed, nan_stretches)
+    assert_same_signal(macd_strategy(df, fast, slow, signal_period),
+                       loop_macd_strategy(df, fast, slow, signal_period))
@@ -0,0 +1,91 @@
+"""Parity of the loop-free exit overlays with a per-bar stop / target / trailing-stop loop."""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from app.backtest.engine import apply_exits, WithExits, sma_crossover, rsi_strategy, momentum_strategy
+
+
+# --- Reference loop implementation ---
+
+def loop_exits(df, signals, stop_loss=None, take_profit=None, trailing_stop=None):
+    """Exit at the first bar whose low/high crosses a level; stay flat until the base signal re-enters"""
+    close, high, low = df['close'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy()
+    positions = np.asarray(signals, dtype=float)
+    out = positions.copy()
+    in_trade = exited = False
+    for i in range(len(positions)):
+        if positions[i] <= 0:
+            in_trade = False
+            continue
+        if not in_trade:
+            in_trade, exited = True, False
+            entry = close[i - 1] if i > 0 else close[0]
+            highest = entry
+        if exited:
+            out[i] = 0
+            continue
+        hit = ((stop_loss and low[i] <= entry * (1 - stop_loss))
+               or (take_profit and high[i] >= entry * (1 + take_profit))
+               or (trailing_stop and low[i] <= highest * (1 - trailing_stop)))
+        highest = max(highest, high[i])
+        exited = bool(hit)
+    return out
+
+
+# --- Fixtures ---
+
+def random_candles(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2020-01-01', periods=n, freq='D')
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'volume': 1.0}, index=index)
+
+STRATEGIES = [
+    (sma_crossover, {'short': 10, 'long': 50}),
+    (rsi_strategy, {'low': 30, 'high': 70}),
+    (momentum_strategy, {'period': 5, 'threshold': -1}),  # long from bar 6 on: one long trade
+]
+
+EXITS = [
+    (0.02, None, None),
+    (None, 0.05, None),
+    (None, None, 0.03),
+    (0.05, 0.1, 0.03),
+    (None, None, None),
+]
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("strategy,params", STRATEGIES)
+@pytest.mark.parametrize("stop_loss,take_profit,trailing_stop", EXITS)
+def test_apply_exits_matches_loop(seed, strategy, params, stop_loss, take_profit, trailing_stop):
+    df = random_candles(1500, seed)
+    signals = strategy(df, **params)
+    overlaid = apply_exits(df, signals, stop_loss, take_profit, trailing_stop)
+    assert isinstance(overlaid, pd.Series)
+    assert np.array_equal(overlaid.to_numpy(), loop_exits(df, signals, stop_loss, take_profit, trailing_stop))
+    assert np.array_equal(apply_exits(df, signals.to_numpy(), stop_loss, take_profit, trailing_stop),
+                          overlaid.to_numpy())
+
+
+def test_exits_only_ever_flatten():
+    df = random_candles(800, 3)
+    signals = sma_crossover(df, 5, 20)
+    overlaid = apply_exits(df, signals, 0.01, 0.02, 0.01)
+    assert (overlaid <= signals).all()
+    assert overlaid.sum() < signals.sum()
+
+
+def test_with_exits_wraps_the_base_strategy():
+    df = random_candles(600, 4)
+    wrapped = WithExits(rsi_strategy)
+    assert np.array_equal(wrapped(df, low=30, high=70), rsi_strategy(df, low=30, high=70))
+    assert np.array_equal(wrapped(df, low=30, high=70, stop_loss=0.02),
+                          apply_exits(df, rsi_strategy(df, low=30, high=70), stop_loss=0.02))
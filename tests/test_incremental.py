@@ -0,0 +1,119 @@
+"""Tracked strategies kept up to date incrementally must match a fresh backtest() over the stored candles."""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from app.backtest import incremental
+from app.backtest.engine import backtest, get_adaptive_strategy_grid, WithExits
+from app.data.candles import load_candles
+from app.data.db import save_to_db
+
+
+# --- Fixtures ---
+
+def candle_rows(symbol, n, seed):
+    """Seeded daily OHLCV random walk in save_to_db()'s row format"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'symbol': symbol, 'type': 'stock', 'interval': 'daily',
+        'timestamp': pd.date_range('2015-01-01', periods=n, freq='D'),
+        'open': close, 'high': close * (1 + rng.uniform(0, 0.01, n)), 'low': close * (1 - rng.uniform(0, 0.01, n)),
+        'close': close, 'volume': 1000.0,
+    })
+
+CASES = [
+    ('SMA', {'short': 10, 'long': 50}),
+    ('Williams_R', {'period': 7, 'oversold': -90, 'overbought': -10}),  # latching: depends on the window start
+    ('Bollinger', {'window': 20, 'stddev': 2}),
+    ('RSI', {'low': 30, 'high': 70, 'length': 14, 'trailing_stop': 0.05}),  # exit overlay
+]
+
+METRICS = ['pnl', 'sharpe', 'sortino', 'max_drawdown', 'win_rate', 'trades', 'volatility']
+
+
+def assert_matches_backtest(symbol, state_db, cases=CASES):
+    board = {row['strategy']: row['stats'] for row in incremental.leaderboard(symbol, 'daily', db_path=state_db)}
+    df = load_candles(symbol, 'stock', 'daily')
+    for strat_name, params in cases:
+        func = get_adaptive_strategy_grid(0)[strat_name]['func']
+        func = WithExits(func) if 'trailing_stop' in params else func
+        reference = backtest(df, func(df, **params), include_curve=False)
+        for key in METRICS:
+            assert board[strat_name][key] == pytest.approx(reference[key], rel=1e-9, abs=1e-9), (strat_name, key)
+
+
+def track_all(symbol, state_db, cases=CASES):
+    for strat_name, params in cases:
+        result = incremental.track_strategy('stock', symbol, 'daily', strat_name, params, db_path=state_db)
+        assert result['status'] == 'success'
+
+
+# --- Tests ---
+
+def test_refresh_matches_full_backtest(tmp_path):
+    state_db = str(tmp_path / "state.db")
+    rows = candle_rows('INC1', 900, 1)
+    save_to_db(rows.iloc[:600])
+    track_all('INC1', state_db)
+    for start in range(600, 900, 75):
+        save_to_db(rows.iloc[start:start + 75])
+        assert incremental.refresh_tracked('INC1', 'daily', warmup=120, db_path=state_db) == len(CASES)
+    assert_matches_backtest('INC1', state_db)
+
+
+def test_short_warmup_falls_back_to_a_full_pass(tmp_path, capsys):
+    # Finite-window indicators with a warm-up long enough for their values but too short
+    # for the latch: the window starts flat while the full history may be long
+    cases = [('Williams_R', {'period': 7, 'oversold': -90, 'overbought': -10}),
+             ('Bollinger', {'window': 20, 'stddev': 2})]
+    state_db = str(tmp_path / "state.db")
+    rows = candle_rows('INC4', 900, 4)
+    save_to_db(rows.iloc[:500])
+    track_all('INC4', state_db, cases)
+    for start in range(500, 900, 20):
+        save_to_db(rows.iloc[start:start + 20])
+        incremental.refresh_tracked('INC4', 'daily', warmup=30, db_path=state_db)
+    assert "warm-up window out of step" in capsys.readouterr().out
+    assert_matches_backtest('INC4', state_db, cases)
+
+
+def test_refresh_without_new_bars_is_a_no_op(tmp_path):
+    state_db = str(tmp_path / "state.db")
+    save_to_db(candle_rows('INC2', 300, 2))
+    track_all('INC2', state_db)
+    assert incremental.refresh_tracked('INC2', 'daily', db_path=state_db) == 0
+    assert incremental.refresh_tracked('INC2', 'daily', db_path=str(tmp_path / "missing.db")) == 0
+
+
+def test_track_without_data_is_an_error(tmp_path):
+    result = incremental.track_strategy('stock', 'NODATA', 'daily', 'SMA', {'short': 10, 'long': 50},
+                                        db_path=str(tmp_path / "state.db"))
+    assert result['status'] == 'error'
+
+
+def test_advance_state_with_no_bars_keeps_the_state():
+    state = incremental.empty_state()
+    assert incremental.advance_state(state, [], [], []) == incremental.empty_state()
+
+
+def test_backfilled_gap_is_recomputed(tmp_path, monkeypatch):
+    ingest = pytest.importorskip("app.data.ingest")
+    state_db = str(tmp_path / "state.db")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "app" / "db").mkdir(parents=True)  # _write_new_rows() appends to app/db/<symbol>.csv
+    monkeypatch.setattr(ingest, "refresh_tracked",
+                        lambda *args, **kwargs: incremental.refresh_tracked(*args, **kwargs, db_path=state_db))
+
+    rows = candle_rows('INC3', 700, 3)
+    gap = rows.iloc[300:340]
+    save_to_db(pd.concat([rows.iloc[:300], rows.iloc[340:600]]))
+    track_all('INC3', state_db)
+
+    # One payload carrying both the gap and newer bars, as a 'full' re-download would
+    payload = pd.concat([gap, rows.iloc[600:]])
+    report = ingest._write_new_rows(payload, 'INC3', 'daily', {"outputsize": "full"})
+    assert report['written'] == len(payload)
+    assert_matches_backtest('INC3', state_db)
@@ -0,0 +1,54 @@
+"""Ingest planning from stored coverage and the missing-row filter."""
+import numpy as np
+import pandas as pd
+import pytest
+
+ingest = pytest.importorskip("app.data.ingest")
+
+from app.data import candles
+from app.data.db import save_to_db
+
+
+def candle_rows(symbol, start, n):
+    close = np.linspace(100, 110, n)
+    return pd.DataFrame({
+        'symbol': symbol, 'type': 'stock', 'interval': 'daily',
+        'timestamp': pd.date_range(start, periods=n, freq='D'),
+        'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1000.0,
+    })
+
+
+@pytest.fixture(scope="module")
+def stored():
+    """ING1: 2020-01-01 .. 2020-01-10 with 2020-01-05 missing"""
+    rows = candle_rows('ING1', '2020-01-01', 10)
+    save_to_db(rows.drop(index=4))
+    return rows
+
+
+@pytest.mark.parametrize("now,outputsize", [
+    ('2020-01-10 18:00', 'skip'),
+    ('2020-02-01', 'compact'),
+    ('2021-01-01', 'full'),
+])
+def test_plan_ingest_from_coverage(stored, now, outputsize):
+    assert ingest.plan_ingest('ING1', 'daily', now=pd.Timestamp(now))["outputsize"] == outputsize
+
+
+def test_plan_ingest_without_stored_bars():
+    assert ingest.plan_ingest('NOTSTORED', 'daily') == {"outputsize": "full", "latest": None, "missing_bars": None}
+
+
+def test_missing_rows_keeps_gaps_and_new_bars(stored):
+    payload = candle_rows('ING1', '2020-01-03', 12)  # overlaps, fills 2020-01-05, adds 4 new bars
+    new = ingest.missing_rows(payload, 'ING1', 'daily')
+    expected = ['2020-01-05'] + [str(day.date()) for day in pd.date_range('2020-01-11', periods=4)]
+    assert [str(ts.date()) for ts in new['timestamp']] == expected
+
+
+def test_missing_rows_without_a_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(candles, "MARKET_DB_PATH", str(tmp_path / "missing" / "market_data.db"))
+    payload = candle_rows('ING2', '2020-01-01', 3)
+    assert len(ingest.missing_rows(payload, 'ING2', 'daily')) == 3
+    assert ingest.plan_ingest('ING2', 'daily')["outputsize"] == "full"
+    assert len(ingest.missing_rows(payload.iloc[:0], 'ING2', 'daily')) == 0
@@ -0,0 +1,139 @@
+"""Parity of the loop-free latch kernels and oscillator strategies with the original per-bar loops."""
+import numpy as np
+import pandas as pd
+import pytest
+
+ta = pytest.importorskip("pandas_ta")
+
+from app.backtest.engine import (
+    latch, threshold_latch, rsi_strategy, bollinger_strategy, stochastic_strategy,
+    williams_r_strategy, momentum_strategy,
+)
+
+
+# --- Reference loop implementations (pre-vectorization) ---
+
+def loop_latch(values, low, high, start=1):
+    """Long below `low`, flat above `high`, hold otherwise; NaN bars hold"""
+    signal = np.zeros(len(values))
+    position = 0
+    for i in range(start, len(values)):
+        if pd.notna(values[i]):
+            if values[i] < low:
+                position = 1
+            elif values[i] > high:
+                position = 0
+        signal[i] = position
+    return signal
+
+def _lagged(positions, index):
+    return pd.Series(positions, index=index).shift(1).fillna(0)
+
+def loop_rsi_strategy(df, low, high, length=14):
+    rsi = ta.rsi(df['close'], length=length)
+    if rsi is None:
+        return pd.Series(0, index=df.index)
+    return _lagged(loop_latch(rsi.to_numpy(dtype=float), low, high), df.index)
+
+def loop_bollinger_strategy(df, window, stddev):
+    bb = ta.bbands(df['close'], length=window, std=stddev)
+    if bb is None or bb.empty:
+        return pd.Series(0, index=df.index)
+    lower = bb.iloc[:, 0].reindex(df.index).to_numpy(dtype=float)
+    upper = bb.iloc[:, 2].reindex(df.index).to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    signal = np.zeros(len(df))
+    position = 0
+    for i in range(1, len(df)):
+        if pd.notna(lower[i]) and pd.notna(upper[i]):
+            if close[i] <= lower[i]:
+                position = 1
+            elif close[i] >= upper[i]:
+                position = 0
+        signal[i] = position
+    return _lagged(signal, df.index)
+
+def loop_stochastic_strategy(df, k_period=14, d_period=3, oversold=20, overbought=80):
+    stoch = ta.stoch(df['high'], df['low'], df['close'], k=k_period, d=d_period)
+    if stoch is None or stoch.empty:
+        return pd.Series(0, index=df.index)
+    k_line = stoch.iloc[:, 0].reindex(df.index).to_numpy(dtype=float)
+    return _lagged(loop_latch(k_line, oversold, overbought), df.index)
+
+def loop_williams_r_strategy(df, period=14, oversold=-80, overbought=-20):
+    wr = ta.willr(df['high'], df['low'], df['close'], length=period)
+    if wr is None or wr.empty:
+        return pd.Series(0, index=df.index)
+    return _lagged(loop_latch(wr.reindex(df.index).to_numpy(dtype=float), oversold, overbought), df.index)
+
+def loop_momentum_strategy(df, period=10, threshold=0.02):
+    momentum = df['close'].pct_change(periods=period).to_numpy(dtype=float)
+    # Long above +threshold, flat below -threshold: the mirror image of loop_latch
+    return _lagged(loop_latch(-momentum, -threshold, threshold, start=period), df.index)
+
+
+# --- Fixtures ---
+
+def random_candles(n, seed, flat=None):
+    """Seeded OHLC random walk; `flat` = (start, stop) freezes every price over that stretch"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    if flat is not None:
+        start, stop = flat
+        close[start:stop] = high[start:stop] = low[start:stop] = close[start]
+    index = pd.date_range('2020-01-01', periods=n, freq='D')
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'volume': 1.0}, index=index)
+
+SERIES = [
+    (500, 1, None),
+    (1200, 2, None),
+    (500, 3, (100, 160)),  # flat prices: RSI is 0 / 0 and the bands collapse
+    (500, 4, (0, 500)),    # flat throughout
+    (12, 5, None),         # shorter than most windows
+]
+
+STRATEGIES = [
+    (rsi_strategy, loop_rsi_strategy, {'low': 30, 'high': 70, 'length': 14}),
+    (rsi_strategy, loop_rsi_strategy, {'low': 20, 'high': 60, 'length': 7}),
+    (bollinger_strategy, loop_bollinger_strategy, {'window': 20, 'stddev': 2}),
+    (stochastic_strategy, loop_stochastic_strategy, {'k_period': 14, 'd_period': 3, 'oversold': 20, 'overbought': 80}),
+    (williams_r_strategy, loop_williams_r_strategy, {'period': 14, 'oversold': -80, 'overbought': -20}),
+    (momentum_strategy, loop_momentum_strategy, {'period': 10, 'threshold': 0.02}),
+]
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("n,seed,flat", SERIES)
+@pytest.mark.parametrize("strategy,reference,params", STRATEGIES)
+def test_strategy_matches_loop(n, seed, flat, strategy, reference, params):
+    df = random_candles(n, seed, flat)
+    assert np.array_equal(np.asarray(strategy(df, **params), dtype=float),
+                          np.asarray(reference(df, **params), dtype=float))
+
+
+@pytest.mark.parametrize("start", [1, 5])
+def test_threshold_latch_matches_loop(start):
+    values = np.random.default_rng(6).uniform(0, 100, 300)
+    values[40:60] = np.nan
+    thresholds = [(30, 70), (20, 80), (50, 50), (10, 90)]
+    batched = threshold_latch(values, thresholds, start)
+    assert batched.shape == (300, len(thresholds))
+    for j, (low, high) in enumerate(thresholds):
+        expected = loop_latch(values, low, high, start)
+        assert np.array_equal(threshold_latch(values, (low, high), start), expected)
+        assert np.array_equal(batched[:, j], expected)
+
+
+def test_latch_prefers_enter_and_ignores_bars_before_start():
+    enter = np.array([1, 0, 0, 1, 0, 0, 0], dtype=bool)
+    exit = np.array([0, 0, 1, 1, 0, 1, 0], dtype=bool)
+    assert latch(enter, exit, start=1).tolist() == [0, 0, 0, 1, 1, 0, 0]
+    assert latch(enter, exit, start=0).tolist() == [1, 1, 0, 1, 1, 0, 0]
+
+
+def test_latch_on_empty_input():
+    assert latch(np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)).shape == (0,)
+    assert threshold_latch(np.zeros(0), [(30, 70), (20, 80)]).shape == (0, 2)
@@ -0,0 +1,91 @@
+"""Parity of the streaming indicators with the batch ones in indicators.py, including flat stretches."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from app.data.indicators import INDICATOR_FUNCTIONS
+from app.data.streaming_indicators import IndicatorStream
+
+
+# --- Fixtures ---
+
+def random_candles(n, seed, flat=()):
+    """Seeded OHLC random walk; each (start, stop) in `flat` freezes every price over that stretch"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    for start, stop in flat:
+        close[start:stop] = high[start:stop] = low[start:stop] = close[start]
+    index = pd.date_range('2020-01-01', periods=n, freq='5min')
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'volume': 1.0}, index=index)
+
+SERIES = [
+    (400, 1, ()),
+    (400, 2, ((0, 40),)),             # flat from the first bar: RSI's averages are both 0
+    (600, 3, ((150, 200), (400, 430))),  # flat stretches longer than every window
+    (10, 4, ()),                       # shorter than the warm-up
+]
+
+CONFIG = {
+    "sma": {"type": "sma", "window": 10},
+    "ema": {"type": "ema", "window": 10},
+    "rsi": {"type": "rsi", "window": 14},
+    "macd": {"type": "macd", "fast": 12, "slow": 26, "signal": 9},
+    "bbands": {"type": "bbands", "window": 20},
+    "stoch": {"type": "stoch", "window": 14},
+    "willr": {"type": "willr", "window": 14},
+}
+
+
+def stream(df, snapshot_every=None):
+    """Feed df through an IndicatorStream, optionally round-tripping it through strict JSON"""
+    indicators = IndicatorStream(CONFIG)
+    outputs = []
+    for i, candle in enumerate(df.to_dict('records')):
+        if snapshot_every and i % snapshot_every == 0:
+            state = json.loads(json.dumps(indicators.snapshot(), allow_nan=False))
+            indicators = IndicatorStream(CONFIG).restore(state)
+        outputs.append(indicators.update(candle))
+    return outputs
+
+
+def batch(df, kind):
+    conf = CONFIG[kind]
+    if kind == "macd":
+        result = INDICATOR_FUNCTIONS[kind](df, conf["fast"], conf["slow"], conf["signal"])
+    else:
+        result = INDICATOR_FUNCTIONS[kind](df, conf["window"])
+    if result is None:
+        return None
+    return result.reindex(df.index).to_numpy(dtype=float)
+
+
+# --- Tests ---
+
+@pytest.mark.parametrize("n,seed,flat", SERIES)
+@pytest.mark.parametrize("kind", ["sma", "rsi", "stoch", "willr"])
+def test_streaming_matches_batch(n, seed, flat, kind):
+    df = random_candles(n, seed, flat)
+    reference = batch(df, kind)
+    streamed = np.array([row[kind] for row in stream(df)], dtype=float)
+    if reference is None:
+        assert np.isnan(streamed).all()
+        return
+    if kind == "stoch":
+        reference = reference[:, :2]
+    assert np.allclose(streamed.reshape(reference.shape), reference, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("n,seed,flat", SERIES)
+def test_snapshot_round_trip_is_strict_json(n, seed, flat):
+    df = random_candles(n, seed, flat)
+    plain = stream(df)
+    restored = stream(df, snapshot_every=7)
+    for a, b in zip(plain, restored):
+        for kind in CONFIG:
+            assert np.allclose(np.asarray(a[kind], dtype=float), np.asarray(b[kind], dtype=float), equal_nan=True)
@@ -0,0 +1,42 @@
+"""Walk-forward window layout and its guards against empty or negative windows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandas_ta")
+
+from app.backtest.walkforward import walk_forward_windows, walk_forward
+
+
+def random_candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2020-01-01', periods=n, freq='D')
+    return pd.DataFrame({'open': close, 'high': close * 1.005, 'low': close * 0.995, 'close': close, 'volume': 1.0},
+                        index=index)
+
+
+@pytest.mark.parametrize("anchored", [False, True])
+def test_windows_tile_the_test_range(anchored):
+    windows = walk_forward_windows(100, 30, 20, anchored)
+    assert [w[2:] for w in windows] == [(30, 50), (50, 70), (70, 90), (90, 100)]
+    for train_start, train_end, test_start, _ in windows:
+        assert train_end == test_start
+        assert train_start == (0 if anchored else train_end - 30)
+
+
+def test_no_window_when_training_covers_the_data():
+    assert walk_forward_windows(30, 30, 10) == []
+    assert walk_forward_windows(0, 1, 1) == []
+
+
+@pytest.mark.parametrize("train_bars,test_bars", [(30, 0), (30, -5), (0, 10), (-1, 10)])
+def test_non_positive_window_sizes_are_rejected(train_bars, test_bars):
+    with pytest.raises(ValueError):
+        walk_forward_windows(100, train_bars, test_bars)
+    with pytest.raises(ValueError):
+        walk_forward(random_candles(100), 10000, 'sharpe', train_bars, test_bars)
+
+
+def test_walk_forward_without_a_full_window_returns_none():
+    assert walk_forward(random_candles(50), 10000, 'sharpe', train_bars=60, test_bars=10) is None